@@ -1,8 +1,21 @@
+from array import array
+from dataclasses import dataclass, field
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Union, Optional, Literal
+from typing import BinaryIO, ClassVar, Iterable, Iterator, Dict, List, Union, Optional, Literal, TextIO, Tuple
+import codecs
+import io
+import json
+import os
+import sys
 import uuid
 import time
 
+try:
+    # Serializes the bookmark tree several times faster, straight to bytes.
+    import orjson
+except ImportError:
+    orjson = None
+
 
 # Define the Bookmark model with constant type using Literal.
 class Bookmark(BaseModel):
@@ -43,96 +56,277 @@ class BookmarkTree(Folder):
     root: str = "placesRoot"
 
 
+# Internal tree used by BookmarkManager while building. Folders are plain
+# slotted dataclasses (no validation, no per-instance __dict__). Bookmarks, which
+# make up the bulk of the tree, are kept column-wise in _BookmarkColumns and a
+# folder refers to them by row number. The pydantic models above are only
+# materialized when the `tree` property is read.
+class _BookmarkColumns:
+    """
+    Structure-of-arrays store for bookmark leaves. Numbers live unboxed in
+    `array`s; lastModified equals dateAdded and iconUri is always empty for
+    bookmarks created by the manager, so neither is stored.
+    """
+    __slots__ = ("guid", "title", "uri", "index", "date", "id")
+
+    def __init__(self) -> None:
+        self.guid: List[str] = []
+        self.title: List[str] = []
+        self.uri: List[str] = []
+        self.index = array("l")
+        self.date = array("q")
+        self.id = array("q")
+
+    def append(self, guid: str, title: str, uri: str, index: int, date: int, id: int) -> int:
+        """Store one bookmark and return its row number."""
+        row = len(self.guid)
+        self.guid.append(guid)
+        self.title.append(title)
+        self.uri.append(uri)
+        self.index.append(index)
+        self.date.append(date)
+        self.id.append(id)
+        return row
+
+    def values(self, row: int) -> Dict[str, object]:
+        """Field values of one bookmark, in `Bookmark` field order."""
+        date = self.date[row]
+        return {
+            "guid": self.guid[row],
+            "title": self.title[row],
+            "index": self.index[row],
+            "dateAdded": date,
+            "lastModified": date,
+            "id": self.id[row],
+            "typeCode": 1,
+            "type": "text/x-moz-place",
+            "uri": self.uri[row],
+            "iconUri": None,
+        }
+
+
+@dataclass(slots=True)
+class _FolderNode:
+    FIELDS: ClassVar[Tuple[str, ...]] = tuple(name for name in Folder.model_fields if name != "children")
+    typeCode: ClassVar[int] = 2
+    type: ClassVar[str] = "text/x-moz-place-container"
+
+    guid: str
+    title: str
+    index: int
+    dateAdded: int
+    lastModified: int
+    id: int
+    root: Optional[str] = None
+    # Subfolders as nodes, bookmarks as row numbers into _BookmarkColumns.
+    children: List[Union["_FolderNode", int]] = field(default_factory=list)
+    # Title -> subfolder, so path lookups do not scan the children.
+    subfolders: Dict[str, "_FolderNode"] = field(default_factory=dict, repr=False)
+
+    def add_folder(self, folder: "_FolderNode") -> None:
+        self.children.append(folder)
+        self.subfolders[folder.title] = folder
+
+    def values(self) -> Dict[str, object]:
+        """Scalar field values, in `Folder` field order."""
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+
+# Pre-encoded '"name": ' prefixes of all scalar fields.
+_FIELD_KEYS: Dict[str, str] = {
+    name: json.dumps(name) + ": "
+    for name in (*Bookmark.model_fields, *Folder.model_fields)
+}
+
+
+# Number of GUIDs drawn from the OS random source at once.
+_GUID_BATCH = 4096
+
+
 # Manager class to hold and update the bookmark tree.
 class BookmarkManager:
     def __init__(self):
         # Create a default tree with "Menu" and "Toolbar" folders.
-        self.tree = BookmarkTree(
+        self._root = _FolderNode(
             guid="root________",
             title="",
             index=0,
             dateAdded=1557425390477000,
             lastModified=1743415451401000,
             id=1,
-            children=[
-                Folder(
-                    guid="menu________",
-                    title="Menu",
-                    index=0,
-                    dateAdded=1557425390477000,
-                    lastModified=1743322321270000,
-                    id=2,
-                    root="bookmarksMenuFolder",
-                    children=[]
-                ),
-                Folder(
-                    guid="toolbar_____",
-                    title="Toolbar",
-                    index=1,
-                    dateAdded=1557425390477000,
-                    lastModified=1743322321270000,
-                    id=3,
-                    root="bookmarksToolbarFolder",
-                    children=[]
-                )
-            ]
+            root="placesRoot",
+        )
+        self._menu_folder: Optional[_FolderNode] = _FolderNode(
+            guid="menu________",
+            title="Menu",
+            index=0,
+            dateAdded=1557425390477000,
+            lastModified=1743322321270000,
+            id=2,
+            root="bookmarksMenuFolder",
         )
+        self._root.add_folder(self._menu_folder)
+        self._root.add_folder(_FolderNode(
+            guid="toolbar_____",
+            title="Toolbar",
+            index=1,
+            dateAdded=1557425390477000,
+            lastModified=1743322321270000,
+            id=3,
+            root="bookmarksToolbarFolder",
+        ))
+        self._bookmarks = _BookmarkColumns()
+        # Resolved folder path (and every prefix of it) -> folder node.
+        self._folder_cache: Dict[str, _FolderNode] = {}
         # Starting value for new IDs.
         self._next_id = 1000
+        # Pre-generated hex GUIDs, refilled in batches of _GUID_BATCH.
+        self._guid_pool = ""
+        self._guid_pos = 0
+
+    @property
+    def tree(self) -> BookmarkTree:
+        """
+        The bookmark tree as pydantic models. This is a snapshot built in one
+        pass from the internal nodes; changes to it are not written back.
+        """
+        bookmarks = self._bookmarks
+        tree = None
+        stack = []
+        for node, is_enter in self._walk_iter():
+            if not is_enter:
+                stack.pop()
+            elif isinstance(node, int):
+                stack[-1].children.append(Bookmark.model_construct(**bookmarks.values(node)))
+            elif not stack:
+                tree = BookmarkTree.model_construct(children=[], **node.values())
+                stack.append(tree)
+            else:
+                model = Folder.model_construct(children=[], **node.values())
+                stack[-1].children.append(model)
+                stack.append(model)
+        return tree
+
+    def _walk_iter(self) -> Iterator[Tuple[Union[_FolderNode, int], bool]]:
+        """
+        Depth-first walk over the tree using an explicit stack.
+
+        Yields `(node, True)` when a node is entered and `(node, False)` when a
+        folder is left. Bookmarks (row numbers) have no children and are only
+        entered. Children are visited in order.
+        """
+        yield self._root, True
+        stack = [(self._root, iter(self._root.children))]
+        while stack:
+            folder, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                yield folder, False
+            elif isinstance(child, int):
+                yield child, True
+            else:
+                yield child, True
+                stack.append((child, iter(child.children)))
+
+    def _plain_tree(self) -> Dict[str, object]:
+        """The bookmark tree as plain dicts and lists, in the JSON layout."""
+        bookmarks = self._bookmarks
+        tree = None
+        stack = []
+        for node, is_enter in self._walk_iter():
+            if not is_enter:
+                stack.pop()
+            elif isinstance(node, int):
+                stack[-1]["children"].append(bookmarks.values(node))
+            else:
+                values = node.values()
+                values["children"] = []
+                if stack:
+                    stack[-1]["children"].append(values)
+                else:
+                    tree = values
+                stack.append(values)
+        return tree
 
     def _get_next_id(self) -> int:
         self._next_id += 1
         return self._next_id
 
+    def _new_guid(self) -> str:
+        """
+        Return a random 32 character hex GUID (same shape as uuid4().hex).
+        The random bytes are read in batches instead of one syscall per GUID.
+        """
+        if self._guid_pos >= len(self._guid_pool):
+            self._guid_pool = os.urandom(16 * _GUID_BATCH).hex()
+            self._guid_pos = 0
+        pos = self._guid_pos
+        self._guid_pos = pos + 32
+        return self._guid_pool[pos:pos + 32]
+
     def _current_timestamp(self) -> int:
         # Return the current time in microseconds.
         return int(time.time() * 1_000_000)
 
-    def _find_or_create_folder(self, folder_path: str) -> Folder:
+    def _find_or_create_folder(self, folder_path: str, now: Optional[int] = None) -> _FolderNode:
         """
         Given a folder path (e.g., "Evelyn/Hobby"), navigate to (or create)
         the folder hierarchy under the "Menu" folder.
+
+        `now` is the timestamp used for every folder created by this call. If
+        omitted, the clock is read once, on the first folder that is created.
         """
+        cached = self._folder_cache.get(folder_path)
+        if cached is not None:
+            return cached
+
         parts = folder_path.split("/")
-        # Start by looking for the "Menu" folder.
-        menu_folder: Optional[Folder] = None
-        for child in self.tree.children:
-            if isinstance(child, Folder) and child.title == "Menu":
-                menu_folder = child
-                break
-        # If "Menu" folder not found, create it.
+        # Start with the "Menu" folder, create it if it is missing.
+        menu_folder = self._menu_folder
         if menu_folder is None:
-            menu_folder = Folder(
+            if now is None:
+                now = self._current_timestamp()
+            menu_folder = _FolderNode(
+                guid=self._new_guid(),
                 title="Menu",
-                index=len(self.tree.children),
-                dateAdded=self._current_timestamp(),
-                lastModified=self._current_timestamp(),
+                index=len(self._root.children),
+                dateAdded=now,
+                lastModified=now,
                 id=self._get_next_id(),
                 root="bookmarksMenuFolder",
-                children=[]
             )
-            self.tree.children.append(menu_folder)
+            self._root.add_folder(menu_folder)
+            self._menu_folder = menu_folder
+            # Cached paths pointed into the old menu folder.
+            self._folder_cache.clear()
 
+        folder_cache = self._folder_cache
         current_folder = menu_folder
+        prefix = None
         for part in parts:
+            prefix = part if prefix is None else f"{prefix}/{part}"
             # Look for an existing subfolder with the matching title.
-            next_folder = None
-            for child in current_folder.children:
-                if isinstance(child, Folder) and child.title == part:
-                    next_folder = child
-                    break
+            next_folder = current_folder.subfolders.get(part)
             # Create new folder if it does not exist.
             if next_folder is None:
-                next_folder = Folder(
+                if now is None:
+                    now = self._current_timestamp()
+                # Titles repeat across many paths; share one string object
+                # as title and as subfolders key.
+                part = sys.intern(part)
+                next_folder = _FolderNode(
+                    guid=self._new_guid(),
                     title=part,
                     index=len(current_folder.children),
-                    dateAdded=self._current_timestamp(),
-                    lastModified=self._current_timestamp(),
+                    dateAdded=now,
+                    lastModified=now,
                     id=self._get_next_id(),
-                    children=[]
                 )
-                current_folder.children.append(next_folder)
+                current_folder.add_folder(next_folder)
             current_folder = next_folder
+            # Warm the cache for the intermediate folders as well.
+            folder_cache[prefix] = current_folder
         return current_folder
 
     def add_bookmark(self, title: str, url: str, folder: str, add_date: str):
@@ -153,18 +347,123 @@ class BookmarkManager:
         """
         add_date_int = int(add_date)
         target_folder = self._find_or_create_folder(folder)
-        new_bookmark = Bookmark(
+        # The bookmark's index is the existing children count in the target folder.
+        row = self._bookmarks.append(
+            guid=self._new_guid(),
             title=title,
             uri=url,
-            dateAdded=add_date_int,
-            lastModified=add_date_int,
-            id=self._get_next_id()
+            index=len(target_folder.children),
+            date=add_date_int,
+            id=self._get_next_id(),
         )
-        # Set bookmark's index based on the existing children count in the target folder.
-        new_bookmark.index = len(target_folder.children)
-        target_folder.children.append(new_bookmark)
+        target_folder.children.append(row)
+
+    def bulk_add(self, entries: Iterable[Tuple[str, str, str, str]]) -> None:
+        """
+        Add many bookmarks at once.
+
+        Parameters:
+          - entries: (title, url, folder, add_date) tuples, as for `add_bookmark`.
+
+        The result is the same as calling `add_bookmark` for every entry in
+        order, but the folder of consecutive entries is resolved only once and
+        all folders created by one call share a timestamp.
+        """
+        now = self._current_timestamp()
+        bookmarks = self._bookmarks
+        find_folder = self._find_or_create_folder
+        last_folder = None
+        target_folder = None
+        for title, url, folder, add_date in entries:
+            # Exports list the bookmarks of a folder one after another
+            if target_folder is None or folder != last_folder:
+                target_folder = find_folder(folder, now)
+                last_folder = folder
+            children = target_folder.children
+            children.append(bookmarks.append(
+                guid=self._new_guid(),
+                title=title,
+                uri=url,
+                index=len(children),
+                date=int(add_date),
+                id=self._get_next_id(),
+            ))
+
+    @staticmethod
+    def _write_fields(write, values: Dict[str, object], level: int) -> None:
+        """Write the opening brace and the given fields of a node at a nesting level."""
+        pad = "\n" + "  " * (level + 1)
+        dumps = json.dumps
+        write("{")
+        write(",".join(f"{pad}{_FIELD_KEYS[name]}{dumps(value, ensure_ascii=False)}"
+                       for name, value in values.items()))
+
+    def write_json(self, fp: TextIO) -> None:
+        """
+        Stream the bookmark tree as JSON into a text file-like object.
+
+        The layout is the same as `to_json` (two space indent), but the document
+        is written node by node while walking the tree instead of being built
+        in memory first.
+        """
+        write = fp.write
+        bookmarks = self._bookmarks
+        # One flag per open folder: True while none of its children is written.
+        first = []
+        for node, is_enter in self._walk_iter():
+            if not is_enter:
+                level = 2 * (len(first) - 1)
+                if first.pop():
+                    write("]\n" + "  " * level + "}")
+                else:
+                    write("\n" + "  " * (level + 1) + "]\n" + "  " * level + "}")
+                continue
+            level = 2 * len(first)
+            if first:
+                if first[-1]:
+                    first[-1] = False
+                else:
+                    write(",")
+                write("\n" + "  " * level)
+            if isinstance(node, int):
+                self._write_fields(write, bookmarks.values(node), level)
+                write("\n" + "  " * level + "}")
+            else:
+                self._write_fields(write, node.values(), level)
+                write(",\n" + "  " * (level + 1) + '"children": [')
+                first.append(True)
+
+    def dump(self, fp: BinaryIO, compact: bool = False) -> None:
+        """
+        Write the bookmark tree as UTF-8 JSON into a binary file-like object,
+        same layout as `to_json` (two space indent) unless `compact` is set.
+        Uses orjson if it is installed, otherwise the JSON is streamed.
+        """
+        if orjson is not None:
+            fp.write(orjson.dumps(self._plain_tree(), option=0 if compact else orjson.OPT_INDENT_2))
+            return
+        writer = codecs.getwriter("utf-8")(fp)
+        if compact:
+            json.dump(self._plain_tree(), writer, ensure_ascii=False, separators=(",", ":"))
+        else:
+            self.write_json(writer)
 
     def to_json(self) -> str:
         """Serialize the entire bookmark tree to a JSON string."""
-        return self.tree.model_dump_json(indent=2)
+        buffer = io.StringIO()
+        self.write_json(buffer)
+        return buffer.getvalue()
+
+    def to_json_bytes(self) -> bytes:
+        """
+        Serialize the bookmark tree to UTF-8 encoded JSON, same layout as
+        `to_json`. Uses orjson if it is installed.
+        """
+        if orjson is None:
+            return self.to_json().encode("utf-8")
+        return orjson.dumps(self._plain_tree(), option=orjson.OPT_INDENT_2)
 
+    def to_msgpack(self) -> bytes:
+        """Serialize the bookmark tree to MessagePack (requires msgspec)."""
+        import msgspec
+        return msgspec.msgpack.encode(self._plain_tree())
@@ -70,8 +70,9 @@ class BookmarkMultiPortAggregatorAgent(MultiPortAggregatorAgent):
         llm_result: BookmarkOutput = inputs[BookmarkOutput]
         bookmark: Bookmark = inputs[Bookmark]
 
-        # Return the unified output structure
-        return BookmarkMultiPortAggregatorOutput(
+        # Return the unified output structure. The parts were validated by the
+        # agents that produced them, so they are wrapped without revalidation.
+        return BookmarkMultiPortAggregatorOutput.model_construct(
             webpage=web_scraping_result,
             llm=llm_result,
             bookmark=bookmark,
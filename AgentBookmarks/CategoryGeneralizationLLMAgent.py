@@ -1,3 +1,4 @@
+import functools
 import textwrap
 from typing import List
 from typing import Type, Iterable
@@ -11,7 +12,42 @@ from AgentFramework.core.ListCollectionAgent import ListModel
 from agent_config import DUMMY_LLM
 from agent_logging import logger, rich_console
 from util.LLMSupport import LLMModel, LLMAgentConfig
-from util.SchemaUtils import generate_template_json
+
+
+@functools.lru_cache(maxsize=4096)
+def _clean_category(text: str) -> str:
+    """
+    Replace '/' (the category separator) by ' - ' and strip whitespace.
+    Category names repeat a lot, so results are cached per input string.
+    """
+    if "/" in text:
+        text = text.replace("/", " - ")
+    return text.strip()
+
+
+# Below this row count the per-row str methods beat the pandas setup cost.
+_VECTORIZE_MIN_ROWS = 10_000
+
+
+def _normalized_pairs(mains: List[str], subs: List[str]) -> set:
+    """
+    Normalizes the main/sub category columns and returns the distinct
+    (main, sub) pairs with a non-empty main category.
+
+    Large inputs are normalized column-wise with pandas when it is installed.
+    """
+    if len(mains) >= _VECTORIZE_MIN_ROWS:
+        try:
+            import pandas as pd
+        except ImportError:
+            pd = None
+        if pd is not None:
+            frame = pd.DataFrame({"main": mains, "sub": subs})
+            for column in ("main", "sub"):
+                frame[column] = frame[column].str.replace("/", " - ", regex=False).str.strip()
+            frame = frame[frame["main"] != ""].drop_duplicates()
+            return set(zip(frame["main"], frame["sub"]))
+    return {pair for pair in zip(map(_clean_category, mains), map(_clean_category, subs)) if pair[0]}
 
 
 class NormalisierteKategorie(BaseModel):
@@ -49,107 +85,9 @@ class KategorieGeneralisierungAntwort(BaseModel):
 
 
 
-class CategoryGeneralizationLLMAgent(ConnectedAgent):
-    """
-    An agent that calls OpenAI's LLMs to summarize and condense news articles.
-
-    Attributes:
-        input_schema (Type[BaseIOSchema]): Expected input schema.
-        output_schema (Type[BaseIOSchema]): Expected output schema.
-    """
-    input_schema = ListModel
-    output_schema = KategorieGeneralisierungAntwort
-
-
-    def __init__(self, config: LLMAgentConfig, uuid:str = 'default') -> None:
-        """
-        Initializes an LLMAgent instance with OpenAI API configuration.
-
-        Args:
-            config (LLMAgentConfig, optional): Configuration for the agent. Defaults to LLMAgentConfig().
-        """
-        super().__init__(config, uuid)
-
-        self.model: LLMModel = LLMModel(config, self.__class__.__name__)
-        self.model.delete_log_files()
-
-
-
-    def run(self, params: ListModel) -> BaseIOSchema:
-        """
-        Processes the user input and returns a structured summary.
-        If `DUMMY_LLM` is enabled, returns dummy data.
-
-        Args:
-            user_input (Optional[BaseIOSchema], optional): The input data. Defaults to None.
-
-        Returns:
-            BaseIOSchema: The processed response from the LLM.
-        """
-        data: Iterable[CategoryMultiPortAggregatorOutput] = params.data
-        result_set = set()
-        for item in params.data: # type: CategoryMultiPortAggregatorOutput
-            # item: CategoryMultiPortAggregatorOutput = item
-            if not item.llm.ist_gueltig:
-                if not item.bookmark.folder:
-                    continue
-                folder_path = item.bookmark.folder.strip()
-                # Split at the first slash
-                if '/' in folder_path:
-                    parts = folder_path.split('/', 1)
-                    main_category = parts[0].replace("/", " - ").strip()
-                    sub_category = parts[1].replace("/", " - ").strip()
-                else:
-                    main_category = folder_path.replace("/", " - ").strip()
-                    sub_category = ""
-            else:
-                main_category = item.category.hauptkategorie.replace("/", " - ").strip()
-                sub_category = item.category.unterkategorie.replace("/", " - ").strip()
-            if not main_category:
-                continue
-            entry = f"{main_category}/{sub_category}" if sub_category else main_category
-            result_set.add(entry)
-        result_string = "\n".join(result_set)
-
-        # raise Exception("Called openai llm")
-
-
-
-
-        if DUMMY_LLM:
-            logger.info(f"LLM in DUMMY MODE for page")
-            result_object = KategorieGeneralisierungAntwort(
-                kategorien=[
-                    NormalisierteKategorie(hauptkategorie="Technik", unterkategorie="Mobile Geräte"),
-                    NormalisierteKategorie(hauptkategorie="Wissenschaft", unterkategorie="Astronomie"),
-                ],
-
-            )
-            return result_object
-
-        else:
-            logger.info(f"LLM call for page category generalizer ")
-            sysprompt = None
-            userprompt =  self._prompt(result_string)
-            try:
-                result_object, usage = self.model.hl_pydantic_completions(sysprompt, userprompt, targetType=self.output_schema, title='Step Generalize')
-                rich_console.print("+ Normalisierte Kategorien:")
-                for i, kategorie in enumerate(result_object.kategorien, 1):
-                    rich_console.print(f"  {i}. Hauptkategorie: {kategorie.hauptkategorie} | Unterkategorie: {kategorie.unterkategorie}")
-            except Exception as e:
-                logger.error(f"{self.__class__.__name__} failed with {e}")
-                result_object = KategorieGeneralisierungAntwort(structure=[], mapping={})
-            #raise Exception("LLM DONE")
-            return result_object
-
-        return KategorieGeneralisierungAntwort.empty()
-
-
-    def _prompt(self, data):
-        schema_dict = LLMModel.openai_schema(self.output_schema)
-        llm_schema = generate_template_json(schema_dict)
-
-        prompt = textwrap.dedent(f"""
+# The prompt is static apart from the category list, so it is dedented and split
+# around the {data} placeholder once at import time.
+_PROMPT_HEAD, _PROMPT_TAIL = textwrap.dedent("""
 Du erhältst eine Liste von Lesezeichen-Kategorien eines Browsers im Format:
 ```
 Hauptkategorie/Unterkategorie
@@ -245,30 +183,30 @@ die Eingaben dies beinhalten.
 ### AUSGABEFORMAT
 
 Gib ein **einziges JSON-Objekt** zurück mit folgender Struktur:
-  {{
+  {
   "kategorien": [
-    {{
+    {
       "hauptkategorie": "...",
       "unterkategorie": "..."
-    }},
+    },
     ...
   ]
-}}
+}
 
 Das bedeutet konkret am Beispiel:
 
-{{
+{
   "kategorien": [
-    {{
+    {
       "hauptkategorie": "Technik",
       "unterkategorie": "Mobile Geräte"
-    }},
-    {{
+    },
+    {
       "hauptkategorie": "Lena",
       "unterkategorie": "Yoga"
-    }}
+    }
   ]
-}}
+}
 
 ---
 
@@ -282,15 +220,15 @@ Reisen/Reisetipps
 ---
 
 ### BEISPIEL OUTPUT:
-{{
+{
   "kategorien": [
-    {{
+    {
       "hauptkategorie": "Reisen",
       "unterkategorie": "Reiseorganisation"
-    }},
+    },
    ...
   ]
-}}
+}
 
 ---
 
@@ -300,6 +238,98 @@ Hier sind nun die Eingabedaten die verarbeitet werden müssen:
 {data}
 ---
 Starte jetzt mit der Generierung des Outputs:
-        """)
+""").split("{data}")
+_PROMPT_HEAD = _PROMPT_HEAD.lstrip()
+_PROMPT_TAIL = _PROMPT_TAIL.rstrip()
+
+
+class CategoryGeneralizationLLMAgent(ConnectedAgent):
+    """
+    An agent that calls OpenAI's LLMs to summarize and condense news articles.
+
+    Attributes:
+        input_schema (Type[BaseIOSchema]): Expected input schema.
+        output_schema (Type[BaseIOSchema]): Expected output schema.
+    """
+    input_schema = ListModel
+    output_schema = KategorieGeneralisierungAntwort
+
+
+    def __init__(self, config: LLMAgentConfig, uuid:str = 'default') -> None:
+        """
+        Initializes an LLMAgent instance with OpenAI API configuration.
+
+        Args:
+            config (LLMAgentConfig, optional): Configuration for the agent. Defaults to LLMAgentConfig().
+        """
+        super().__init__(config, uuid)
+
+        self.model: LLMModel = LLMModel(config, self.__class__.__name__)
+        self.model.delete_log_files_once()
+
+
+
+    def run(self, params: ListModel) -> BaseIOSchema:
+        """
+        Processes the user input and returns a structured summary.
+        If `DUMMY_LLM` is enabled, returns dummy data.
+
+        Args:
+            user_input (Optional[BaseIOSchema], optional): The input data. Defaults to None.
+
+        Returns:
+            BaseIOSchema: The processed response from the LLM.
+        """
+        mains: List[str] = []
+        subs: List[str] = []
+        for item in params.data: # type: CategoryMultiPortAggregatorOutput
+            if not item.llm.ist_gueltig:
+                if not item.bookmark.folder:
+                    continue
+                # Split at the first slash
+                main_raw, _, sub_raw = item.bookmark.folder.partition("/")
+            else:
+                main_raw = item.category.hauptkategorie
+                sub_raw = item.category.unterkategorie
+            mains.append(main_raw)
+            subs.append(sub_raw)
+        result_set = _normalized_pairs(mains, subs)
+        # Entries are deduplicated as (main, sub) pairs and formatted once here.
+        result_string = "\n".join(f"{main}/{sub}" if sub else main for main, sub in result_set)
+
+        # raise Exception("Called openai llm")
+
+
+
+
+        if DUMMY_LLM:
+            logger.info(f"LLM in DUMMY MODE for page")
+            result_object = KategorieGeneralisierungAntwort(
+                kategorien=[
+                    NormalisierteKategorie(hauptkategorie="Technik", unterkategorie="Mobile Geräte"),
+                    NormalisierteKategorie(hauptkategorie="Wissenschaft", unterkategorie="Astronomie"),
+                ],
+
+            )
+            return result_object
 
-        return prompt.strip()
+        else:
+            logger.info(f"LLM call for page category generalizer ")
+            sysprompt = None
+            userprompt =  self._prompt(result_string)
+            try:
+                result_object, usage = self.model.hl_pydantic_completions(sysprompt, userprompt, targetType=self.output_schema, title='Step Generalize')
+                rich_console.print("+ Normalisierte Kategorien:")
+                for i, kategorie in enumerate(result_object.kategorien, 1):
+                    rich_console.print(f"  {i}. Hauptkategorie: {kategorie.hauptkategorie} | Unterkategorie: {kategorie.unterkategorie}")
+            except Exception as e:
+                logger.error(f"{self.__class__.__name__} failed with {e}")
+                result_object = KategorieGeneralisierungAntwort(structure=[], mapping={})
+            #raise Exception("LLM DONE")
+            return result_object
+
+        return KategorieGeneralisierungAntwort.empty()
+
+
+    def _prompt(self, data):
+        return f"{_PROMPT_HEAD}{data}{_PROMPT_TAIL}"
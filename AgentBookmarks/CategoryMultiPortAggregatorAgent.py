@@ -61,7 +61,9 @@ class CategoryMultiPortAggregatorAgent(MultiPortAgent):
         bookmark: Bookmark = inputs[Bookmark]
         category: GenerateCategoryForBookmarkOutput = inputs[GenerateCategoryForBookmarkOutput]
 
-        return CategoryMultiPortAggregatorOutput(
+        # The parts were validated by the agents that produced them, so they are
+        # wrapped without revalidation.
+        return CategoryMultiPortAggregatorOutput.model_construct(
             webpage=web_scraping_result,
             llm=llm_result,
             bookmark=bookmark,
@@ -51,10 +51,9 @@ class CountNumbersAgent(ConnectedAgent):
         Runs the agent.
 
         """
-        result = []
         # Create list of numbers between from and to-1, return as list to
-        # create parallel qeuque
-        for cnt in range(self._config.from_number, self._config.to_number):
-            result.append( CountNumbersAgentSchema(number = cnt))
+        # create parallel qeuque. range() only yields ints, so no validation needed.
+        result = [CountNumbersAgentSchema.model_construct(number=cnt)
+                  for cnt in range(self._config.from_number, self._config.to_number)]
         self.is_active = False
         return result
\ No newline at end of file
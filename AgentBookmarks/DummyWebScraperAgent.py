@@ -5,6 +5,17 @@ from AgentFramework.core.ConnectedAgent import ConnectedAgent
 from AtomicTools.webpage_scraper.tool.webpage_scraper import WebpageScraperToolInputSchema, \
     WebpageScraperToolOutputSchema, WebpageScraperToolConfig, WebpageMetadata
 
+_rand = random.random
+# Same error rate as random.randint(0, 10) == 0
+_ERROR_RATE = 1 / 11
+
+# Constant dummy metadata shared by all results, built once without validation.
+_DUMMY_METADATA: WebpageMetadata = WebpageMetadata.model_construct(title = "Dummy title",
+                                                                   author = "Author",
+                                                                   description="Dummy description",
+                                                                   site_name="Dummy Site Name",
+                                                                   domain="Dummy Domain Name")
+
 
 class DummyWebScraperAgent(ConnectedAgent):
     """
@@ -40,18 +51,9 @@ class DummyWebScraperAgent(ConnectedAgent):
         """
 
 
-        metadata: WebpageMetadata = WebpageMetadata(title = "Dummy title",
-                                                    author = "Author",
-                                                    description="Dummy description",
-                                                    site_name="Dummy Site Name",
-                                                    domain="Dummy Domain Name")
-
-
-        random_number = random.randint(0, 10)
-
-        return WebpageScraperToolOutputSchema(
+        return WebpageScraperToolOutputSchema.model_construct(
             content = f"This is dummy webpage content {params.url}",
-            error = None if random_number > 0 else "Random web error",
-            metadata = metadata,
+            error = None if _rand() >= _ERROR_RATE else "Random web error",
+            metadata = _DUMMY_METADATA,
 
-        )
\ No newline at end of file
+        )
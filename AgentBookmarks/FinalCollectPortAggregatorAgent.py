@@ -1,9 +1,15 @@
+import asyncio
+import functools
+import logging
+import sys
 import textwrap
-from typing import Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple
 from typing import List
 
 from atomic_agents.lib.base.base_tool import BaseToolConfig
 from pydantic import BaseModel
+from rich.progress import Progress
 
 from AgentBookmarks.CategoryGeneralizationLLMAgent import KategorieGeneralisierungAntwort, NormalisierteKategorie
 from AgentBookmarks.FirefoxBookmarkAgent import FirefoxBookmarksOutput, Bookmark
@@ -14,9 +20,87 @@ from AgentFramework.core.MultiPortAgent import MultiPortAggregatorAgent
 from AgentNews.NewsSchema import MergedOutput
 from agent_config import DUMMY_LLM
 from agent_logging import logger, rich_console
+from util.LLMCache import LLMCache
 from util.LLMSupport import LLMModel, LLMAgentConfig
 
 
+# Prompt for matching one bookmark category against the final categories,
+# dedented once at import. Filled in with str.format.
+_MATCH_PROMPT_TEMPLATE = textwrap.dedent("""
+Deine Aufgabe besteht darin, eine Benutzereingabe eines neuen Lesezeichens möglichst genau einer bestehenden
+Kategorie aus einer vorgegebenen Liste von Browser-Lesezeichen zuzuordnen.
+Ziel ist es, dass Lesezeichen in den ähnlichst möglichen Ordner kopiert werden können.
+
+## Eingaben:
+### 1. Existierende Kategorien-Liste (aus dieser muss die Ausgabe gewählt werden):
+{categories_block}
+
+### 2. Benutzerverzeichnis (als zusätzlicher Kontext um die Intention des Benutzers zu verstehen):
+{folder}
+
+### 3. Benutzereingabe (das zu suchende und zu kategorisierende Lesezeichen):
+{target}
+
+## Aufgabe:
+Ordne die Benutzereingabe der am besten passenden Kategorie aus der vorgegebenen Liste zu. 
+Berücksichtige dabei Folgendes:
+
+- Die ausgegebene Kategorie muss **exakt identisch** mit einer Zeile (Kategorie) aus der Liste sein.
+- **Erstelle niemals neue Kategorien**, außer in dem einen Ausnahmefall unten beschrieben ('unsortiert').
+- Die Eingabe kann ungenau sein, Tippfehler enthalten, in einer anderen Sprache sein oder Synonyme verwenden.
+- Die Eingabe kann unter Umständen nur ein ähnliches Thema behandeln. Dann gilt es klug zu matchen.
+- Priorisiere die genaue Übereinstimmung von **Hauptkategorien** vor der Übereinstimmung von Unterkategorien.
+- Hauptkategorien mit **Eigennamen** (z.B. 'Bob' und als Eingabe 'Bob/Reisen-Hawaii') dürfen **niemals geändert** werden. 
+In diesen Fällen immer die exakte Hauptnamenskategorie wählen, und die beste Unterkategorie suchen (z.B. 'Bob/Reisen') 
+
+## Notfall-Sonderregel für komplett fehlende Übereinstimmung:
+- Wenn keine passende Unterkategorie existiert, wähle die beste Hauptkategorie 
+  und ergänze mit Unterkategorie ''unsortiert' (z.B. „Nachrichten/Unsortiert“).
+- Falls absolut keine Hauptkategorie passt, verwende die Kategorie **Unsortiert**.
+Wichtig: Diese Notfallregel darf nur angewendet werden, wenn es überhaupt keine ähnlichen oder sinnvoll anpassbaren
+Kategorien gibt. Sie dient nur dazu leeren Output zu vermeiden. Zu bevorzugen ist immer ein thematischer ähnlicher Match.
+
+## Vorgehensweise (Priorität):
+1. Prüfe zuerst direkte Übereinstimmungen.
+2. Prüfe Schreibfehler, ähnliche Namen, Übersetzungen in Fremdsprachen
+3. Prüfe Eigennamen der Hauptkategorie
+4. Prüfe indirekte oder thematisch ähnliche Übereinstimmungen von Hauptkategorien.
+5. Prüfe indirekte oder thematisch ähnliche Übereinstimmungen von Untertkategorien.
+6. Prüfe Analogien - wo würde es thematisch einsortiert werden können - berücksichtige Eingabe und Kontext
+7. Nutze „unsortiert“ nur, wenn keine bessere Lösung existiert (absoluter Notfall).
+
+Tipp: Berücksichtige das Kontextverzeichnis bei Unsicherheit zur thematischen Einordnung.
+
+## Ausgabeformat:
+- Gib **ausschließlich** genau einen Eintrag einer Kategorie der Eingabeliste aus.
+- Gib nur eine Zeile, d.h. die Katogorie zurück
+- **Keine** zusätzlichen Texte, Kommentare, Quotes oder Formatierungen.
+
+## Beispiel:
+**Benutzereingabe:**  
+> Sport/Mein Yoga
+
+**Kontext:**  
+> Yoga Tutorials
+
+**Kategorien-Liste:**  
+- Sport/Yoga-Tutorials
+- Reisen/...
+- ...
+
+**Ausgabe:**  
+Sport/Yoga-Tutorials
+
+Halte dich strikt an diese Anweisungen und gib jetzt die am besten passende Kategorie zurück:
+""").strip()
+
+
+def _cap(text: str) -> str:
+    """Strip the text and upper-case its first character only."""
+    text = text.strip()
+    return text[:1].upper() + text[1:]
+
+
 class FinalCollectPortAggregatorAgent(MultiPortAggregatorAgent):
     """
     Agent that merges search results, web scraping results, and LLM-generated news into a unified data structure.
@@ -44,14 +128,20 @@ class FinalCollectPortAggregatorAgent(MultiPortAggregatorAgent):
         """
         super().__init__(config, uuid=uuid)
         self.model: LLMModel = LLMModel(config, self.__class__.__name__)
-        self.model.delete_log_files()
+        self.model.delete_log_files_once()
+        # Usable LLM answers of earlier runs, '' for no match. A run itself
+        # asks for every distinct (target, folder) only once anyway.
+        self._match_cache = LLMCache(config.cache_file) if config.cache_file else None
 
     @staticmethod
+    @functools.lru_cache(maxsize=4096)
     def is_multiline(s):
         non_empty_lines = [line for line in s.splitlines() if line.strip()]
         return len(non_empty_lines) > 1
 
-    def format_category(self, cat_llm: str) -> str:
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def format_category(cat_llm: str) -> str:
         """
         Convert an LLM‑supplied category string into
         'Main/Sub‑Part - Deeper - StillDeeper' form.
@@ -62,25 +152,21 @@ class FinalCollectPortAggregatorAgent(MultiPortAggregatorAgent):
           • Leading/trailing whitespace is stripped.
           • Each preserved segment is capitalised only on its first letter.
           • Empty, None, or just‑whitespace input → '' (empty string).
+
+        Only a few distinct categories occur, so results are cached.
         """
         # ---------- early exit ----------
         if not cat_llm or not cat_llm.strip():
             return ""
 
-        def smart_capitalize(text: str) -> str:
-            text = text.strip()
-            return text and text[0].upper() + text[1:] or ""
-
         # ---------- split at *first* slash ----------
-        main_raw, *sub_raw_list = cat_llm.strip().split("/", 1)
-        main_category = smart_capitalize(main_raw)
+        main_raw, sep, sub_raw = cat_llm.strip().partition("/")
+        main_category = _cap(main_raw)
 
         # ---------- handle sub‑part (if any) ----------
-        if sub_raw_list:
-            sub_raw = sub_raw_list[0].strip()
+        if sep:
             # split *remaining* slashes, cap each chunk, then join with " - "
-            sub_chunks = [smart_capitalize(chunk) for chunk in sub_raw.split("/") if chunk.strip()]
-            sub_category = " - ".join(sub_chunks)
+            sub_category = " - ".join(_cap(chunk) for chunk in sub_raw.split("/") if chunk.strip())
         else:
             sub_category = ""
 
@@ -105,153 +191,162 @@ class FinalCollectPortAggregatorAgent(MultiPortAggregatorAgent):
         categoryList: List[NormalisierteKategorie] = finalCategories.kategorien
         bookmarks:List[Bookmark] = firefoxBookmarks.bookmarks
 
-        categories = []
-        for kats in categoryList:
-            cat = f"{kats.hauptkategorie}/{kats.unterkategorie}"
-            categories.append(cat)
+        # Final categories as list (for logging), set (exact match) and block (LLM prompt)
+        categories = [sys.intern(f"{kats.hauptkategorie}/{kats.unterkategorie}") for kats in categoryList]
+        categories_set = frozenset(categories)
+        categories_block = "\n".join(categories)
 
         outputBookmarks = FirefoxBookmarksOutput(bookmarks=[])
+        # Loop invariant lookups
+        append_bookmark = outputBookmarks.bookmarks.append
+        rich_print = rich_console.print
+        format_category = self.format_category
+
+        # (search, old_folder) -> final LLM answer within this run. The distinct
+        # pairs that need the LLM are resolved concurrently up front.
+        resolved: Dict[Tuple[str, Optional[str]], Optional[str]] = {}
+        if not DUMMY_LLM:
+            pending = {
+                (f"{raw_category.hauptkategorie}/{raw_category.unterkategorie}", bookmark.folder)
+                for bookmark, raw_category in zip(bookmarks, listData)
+                if raw_category.hauptkategorie != OFFLINE_BOOKMARK
+            }
+            pending = [key for key in pending if key[0] not in categories_set]
+            if pending:
+                rich_print(f"Matching {len(pending)} distinct categories via LLM")
+                resolved = self._resolve_all_via_llm(pending, categories_block)
 
         min_len = min(len(listData), len(bookmarks))
-        for i in range(min_len):
-            bookmark: Bookmark = bookmarks[i]
-            newBookmark = bookmarks[i].model_copy(deep=True)  # Deep copy using Pydantic v2
-
-            # Match best category from overall categories
-            search = f"{listData[i].hauptkategorie}/{listData[i].unterkategorie}"
-
-            # Check offline pages
-            if listData[i].hauptkategorie == OFFLINE_BOOKMARK:
-                newBookmark.folder = search
-                outputBookmarks.bookmarks.append(newBookmark)
-                rich_console.print(f"[green]Found OFFLINE_BOOKMARK for {search} [/green]")
-                continue
-
-
-            old_folder = bookmark.folder
-
-            # Use LLM for match
-            if DUMMY_LLM:
-                cat_llm = search
-            else:
-                cat_llm = None
-                for tryi in range(1,5):
-                    cat_llm = self._find_via_llm(search, old_folder, categories)
-                    # Found not match that is ok
-                    if not cat_llm:
-                        break
-                    is_multi = FinalCollectPortAggregatorAgent.is_multiline(cat_llm)
-                    # if single line assume it is ok
-                    if not is_multi:
-                        break
-                    rich_console.print(f"[red]LLm did not match category, retrying {tryi} cause we got {cat_llm}[/red]")
-                    cat_llm = None
-            rich_console.print(f"[green]Found match {i}/{min_len} using llm for {search} in folder {old_folder} renaming to {cat_llm}[/green]")
-
-            # We got result
-            if cat_llm:
-                newBookmark.folder = self.format_category(cat_llm)
-            else:
-                logger.warning(f"LLM cannot generate bookmark for {search}")
-                for cat in categories:
-                    logger.warning(f"  - available would be: {cat}")
-                newBookmark.folder = self.format_category(search)
-            outputBookmarks.bookmarks.append(newBookmark)
-            rich_console.print(f"[green]Append bookmark {i}/{min_len}  {newBookmark.folder} instead of old folder {old_folder} [/green]")
+        # Per-row details only go to the debug log, the console shows a progress bar.
+        debug = logger.isEnabledFor(logging.DEBUG)
+        with Progress(console=rich_console) as progress:
+            task = progress.add_task("Assigning bookmark folders", total=min_len)
+            advance = progress.advance
+            for i, (bookmark, raw_category) in enumerate(zip(bookmarks, listData)): # type: int, (Bookmark, GenerateCategoryForBookmarkOutput)
+                main_category = raw_category.hauptkategorie
+                # Match best category from overall categories
+                search = f"{main_category}/{raw_category.unterkategorie}"
+
+                # Check offline pages
+                if main_category == OFFLINE_BOOKMARK:
+                    # Bookmark only holds strings, a shallow copy with the new folder is enough
+                    append_bookmark(bookmark.model_copy(update={"folder": search}))
+                    if debug:
+                        logger.debug(f"Found OFFLINE_BOOKMARK for {search}")
+                    advance(task)
+                    continue
+
+
+                old_folder = bookmark.folder
+
+                # Exact match with a final category, no need to ask the LLM
+                if search in categories_set:
+                    cat_llm = search
+                # Use LLM for match
+                elif DUMMY_LLM:
+                    cat_llm = search
+                # Resolved up front by _resolve_all_via_llm, including failed retries
+                else:
+                    cat_llm = resolved.get((search, old_folder))
+                if debug:
+                    logger.debug(f"Found match {i}/{min_len} using llm for {search} in folder {old_folder} renaming to {cat_llm}")
+
+                # We got result
+                if cat_llm:
+                    new_folder = format_category(cat_llm)
+                else:
+                    logger.warning(f"LLM cannot generate bookmark for {search}")
+                    for cat in categories:
+                        logger.warning(f"  - available would be: {cat}")
+                    new_folder = format_category(search)
+                append_bookmark(bookmark.model_copy(update={"folder": new_folder}))
+                if debug:
+                    logger.debug(f"Append bookmark {i}/{min_len}  {new_folder} instead of old folder {old_folder}")
+                advance(task)
 
         return outputBookmarks
 
-    def _find_via_llm(self, target:str, folder:str, categories:List[str]) -> str:
-        if DUMMY_LLM and False:
-                logger.info(f"LLM in DUMMY MODE for boomark search")
-                return None
-        else:
-            logger.info(f"LLM call for bookmark search")
-            sysprompt = None
-            userprompt =  self.build_llm_match_prompt(target, folder, categories)
-            # print("LLM FIND PROMPT",userprompt)
-            try:
-                result, usage = self.model.create_text_completions(sysprompt, userprompt, temperature=0.1)
-                if result:
-                    result = result.strip()
-                if result and result == "KEINE":
-                    result = None
-                return result
-            except Exception as e:
-                logger.error(f"{self.__class__.__name__} failed with {e}")
+    def _resolve_all_via_llm(self,
+                             keys: Iterable[Tuple[str, Optional[str]]],
+                             categories_block: str) -> Dict[Tuple[str, Optional[str]], Optional[str]]:
+        """
+        Resolve all (search, folder) pairs with at most `max_concurrency` LLM
+        requests in flight. The event loop runs in its own thread, so this also
+        works when called from a running loop.
+        """
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, self._aresolve_all(list(keys), categories_block)).result()
+
+    async def _aresolve_all(self,
+                            keys: List[Tuple[str, Optional[str]]],
+                            categories_block: str) -> Dict[Tuple[str, Optional[str]], Optional[str]]:
+        semaphore = asyncio.Semaphore(self.config.max_concurrency or 16)
+
+        async def resolve(search: str, folder: Optional[str]) -> Optional[str]:
+            async with semaphore:
+                for tryi in range(1, 5):
+                    cat_llm = await self._afind_via_llm(search, folder, categories_block)
+                    # Found not match or a single line, that is ok
+                    if not cat_llm or not self.is_multiline(cat_llm):
+                        return cat_llm
+                    rich_console.print(f"[red]LLm did not match category, retrying {tryi} cause we got {cat_llm}[/red]")
                 return None
 
-    from typing import List
-
-    def build_llm_match_prompt(self, target: str, folder: str, categories: List[str]) -> str:
-        categories_block = "\n".join(categories)
-
-        prompt = textwrap.dedent(f"""
-Deine Aufgabe besteht darin, eine Benutzereingabe eines neuen Lesezeichens möglichst genau einer bestehenden
-Kategorie aus einer vorgegebenen Liste von Browser-Lesezeichen zuzuordnen.
-Ziel ist es, dass Lesezeichen in den ähnlichst möglichen Ordner kopiert werden können.
-
-## Eingaben:
-### 1. Existierende Kategorien-Liste (aus dieser muss die Ausgabe gewählt werden):
-{categories_block}
-
-### 2. Benutzerverzeichnis (als zusätzlicher Kontext um die Intention des Benutzers zu verstehen):
-{folder}
-
-### 3. Benutzereingabe (das zu suchende und zu kategorisierende Lesezeichen):
-{target}
-
-## Aufgabe:
-Ordne die Benutzereingabe der am besten passenden Kategorie aus der vorgegebenen Liste zu. 
-Berücksichtige dabei Folgendes:
+        try:
+            results = await asyncio.gather(*(resolve(search, folder) for search, folder in keys))
+        finally:
+            # The loop of this call ends now, its client would leak otherwise
+            await self.model.aclose()
+        return dict(zip(keys, results))
+
+    async def _afind_via_llm(self, target: str, folder: str, categories_block: str) -> Optional[str]:
+        """Async version of `_find_via_llm`, sharing its cache."""
+        key, cached = self._cached_match(target, folder, categories_block)
+        if cached is not None:
+            return cached or None
+        userprompt = self.build_llm_match_prompt(target, folder, categories_block)
+        try:
+            result, usage = await self.model.acreate_text_completions(None, userprompt, temperature=0.1)
+        except Exception as e:
+            logger.error(f"{self.__class__.__name__} failed with {e}")
+            return None
+        return self._remember_match(key, result)
+
+    def _find_via_llm(self, target:str, folder:str, categories_block:str) -> Optional[str]:
+        key, cached = self._cached_match(target, folder, categories_block)
+        if cached is not None:
+            return cached or None
+        logger.info(f"LLM call for bookmark search")
+        userprompt = self.build_llm_match_prompt(target, folder, categories_block)
+        try:
+            result, usage = self.model.create_text_completions(None, userprompt, temperature=0.1)
+        except Exception as e:
+            logger.error(f"{self.__class__.__name__} failed with {e}")
+            return None
+        return self._remember_match(key, result)
+
+    def _cached_match(self, target: str, folder: str, categories_block: str) -> Tuple[Optional[str], Optional[str]]:
+        """Cache key of the match request and the earlier answer, '' for no match, None if unknown."""
+        if self._match_cache is None:
+            return None, None
+        key = LLMCache.key(self.model.name(), target, folder, categories_block)
+        return key, self._match_cache.get(key)
+
+    def _remember_match(self, key: Optional[str], result: Optional[str]) -> Optional[str]:
+        """Normalize an LLM match answer ('KEINE' is no match) and pin the usable ones."""
+        if result:
+            result = result.strip()
+        if result == "KEINE":
+            result = None
+        # Multi-line answers are retried by the caller, do not pin them.
+        if key is not None and (not result or not self.is_multiline(result)):
+            self._match_cache.put(key, result or "")
+        return result or None
 
-- Die ausgegebene Kategorie muss **exakt identisch** mit einer Zeile (Kategorie) aus der Liste sein.
-- **Erstelle niemals neue Kategorien**, außer in dem einen Ausnahmefall unten beschrieben ('unsortiert').
-- Die Eingabe kann ungenau sein, Tippfehler enthalten, in einer anderen Sprache sein oder Synonyme verwenden.
-- Die Eingabe kann unter Umständen nur ein ähnliches Thema behandeln. Dann gilt es klug zu matchen.
-- Priorisiere die genaue Übereinstimmung von **Hauptkategorien** vor der Übereinstimmung von Unterkategorien.
-- Hauptkategorien mit **Eigennamen** (z.B. 'Bob' und als Eingabe 'Bob/Reisen-Hawaii') dürfen **niemals geändert** werden. 
-In diesen Fällen immer die exakte Hauptnamenskategorie wählen, und die beste Unterkategorie suchen (z.B. 'Bob/Reisen') 
-
-## Notfall-Sonderregel für komplett fehlende Übereinstimmung:
-- Wenn keine passende Unterkategorie existiert, wähle die beste Hauptkategorie 
-  und ergänze mit Unterkategorie ''unsortiert' (z.B. „Nachrichten/Unsortiert“).
-- Falls absolut keine Hauptkategorie passt, verwende die Kategorie **Unsortiert**.
-Wichtig: Diese Notfallregel darf nur angewendet werden, wenn es überhaupt keine ähnlichen oder sinnvoll anpassbaren
-Kategorien gibt. Sie dient nur dazu leeren Output zu vermeiden. Zu bevorzugen ist immer ein thematischer ähnlicher Match.
-
-## Vorgehensweise (Priorität):
-1. Prüfe zuerst direkte Übereinstimmungen.
-2. Prüfe Schreibfehler, ähnliche Namen, Übersetzungen in Fremdsprachen
-3. Prüfe Eigennamen der Hauptkategorie
-4. Prüfe indirekte oder thematisch ähnliche Übereinstimmungen von Hauptkategorien.
-5. Prüfe indirekte oder thematisch ähnliche Übereinstimmungen von Untertkategorien.
-6. Prüfe Analogien - wo würde es thematisch einsortiert werden können - berücksichtige Eingabe und Kontext
-7. Nutze „unsortiert“ nur, wenn keine bessere Lösung existiert (absoluter Notfall).
-
-Tipp: Berücksichtige das Kontextverzeichnis bei Unsicherheit zur thematischen Einordnung.
-
-## Ausgabeformat:
-- Gib **ausschließlich** genau einen Eintrag einer Kategorie der Eingabeliste aus.
-- Gib nur eine Zeile, d.h. die Katogorie zurück
-- **Keine** zusätzlichen Texte, Kommentare, Quotes oder Formatierungen.
-
-## Beispiel:
-**Benutzereingabe:**  
-> Sport/Mein Yoga
-
-**Kontext:**  
-> Yoga Tutorials
-
-**Kategorien-Liste:**  
-- Sport/Yoga-Tutorials
-- Reisen/...
-- ...
-
-**Ausgabe:**  
-Sport/Yoga-Tutorials
-
-Halte dich strikt an diese Anweisungen und gib jetzt die am besten passende Kategorie zurück:
-        """).strip()
-
-        return prompt
+    @staticmethod
+    def build_llm_match_prompt(target: str, folder: str, categories_block: str) -> str:
+        """
+        Build the match prompt. `categories_block` is the newline separated list
+        of final categories, joined once per run by the caller.
+        """
+        return _MATCH_PROMPT_TEMPLATE.format(categories_block=categories_block, folder=folder, target=target)
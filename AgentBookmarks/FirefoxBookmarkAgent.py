@@ -1,11 +1,28 @@
 import os
-from typing import Optional, List
+from typing import Optional, List, Union
 import json
 
 from atomic_agents.lib.base.base_tool import BaseToolConfig
 from pydantic import BaseModel, Field
 from AgentFramework.core.ConnectedAgent import ConnectedAgent
-from bs4 import BeautifulSoup
+
+try:
+    # Considerably faster on large backups; raises a json.JSONDecodeError subclass.
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+
+# Built-in root folders that are not added to the folder path of their children.
+_BUILTIN_ROOT_FOLDERS = frozenset((
+    "placesRoot",
+    "bookmarksMenuFolder",
+    "toolbarFolder",
+    "unfiledBookmarksFolder",
+    "mobileFolder",
+    "unfiled",
+    "menu",
+))
 
 
 # Define the Bookmark model representing a single bookmark entry.
@@ -57,7 +74,8 @@ class FirefoxBookmarkAgent(ConnectedAgent):
             raise FileNotFoundError(f"Bookmark file not found at path: {filepath}")
 
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
+            # Read raw bytes, the JSON parser decodes UTF-8 itself.
+            with open(filepath, 'rb') as f:
                 file_content = f.read()
         except Exception as e:
             raise RuntimeError(f"Failed to read file: {e}")
@@ -65,86 +83,62 @@ class FirefoxBookmarkAgent(ConnectedAgent):
         if not file_content.strip():
             raise ValueError("Bookmark file is empty")
 
-        #bookmarks = self._parse_bookmarks(html_content)
         bookmarks = self._parse_bookmarks_json(file_content)
 
-        output = FirefoxBookmarksOutput(bookmarks=bookmarks)
+        # The bookmarks are already Bookmark instances.
+        output = FirefoxBookmarksOutput.model_construct(bookmarks=bookmarks)
         return output
 
-    def _parse_bookmarks(self, html_content: str) -> List[Bookmark]:
-        soup = BeautifulSoup(html_content, "html.parser")
-        top_dl = soup.find("dl")
-        if not top_dl:
-            return []
-        return self._parse_dl(top_dl)
-
-    def _parse_dl(self, dl, parent_folder: Optional[str] = None) -> List[Bookmark]:
-        bookmarks = []
-        # Use find_all("dt") – not find_all("dt", recursive=False)
-        for tag in dl.find_all("dt"):
-            folder_tag = tag.find("h3")
-            if folder_tag:
-                folder_name = folder_tag.get_text(strip=True)
-                next_dl = tag.find("dl") or tag.find_next_sibling("dl")
-                if next_dl:
-                    bookmarks.extend(self._parse_dl(next_dl, parent_folder=folder_name))
-            else:
-                a_tag = tag.find("a")
-                if a_tag:
-                    bookmark = Bookmark(
-                        title=a_tag.get_text(strip=True),
-                        url=a_tag.get("href"),
-                        folder=parent_folder,
-                        add_date=a_tag.get("add_date"),
-                    )
-                    bookmarks.append(bookmark)
-        return bookmarks
-
-    def _parse_bookmarks_json(self, json_content: str) -> List[Bookmark]:
+    def _parse_bookmarks_json(self, json_content: Union[bytes, str]) -> List[Bookmark]:
         """
-        Recursively parse the JSON-format bookmark backup from Firefox.
+        Parse the JSON-format bookmark backup from Firefox.
         """
         try:
-            data = json.loads(json_content)
+            data = _json_loads(json_content)
         except json.JSONDecodeError:
             raise ValueError("File is not valid JSON. Consider HTML fallback or verify the file format.")
 
         bookmarks = []
 
-        def recurse(node: dict, parent_folder: Optional[str] = None, level:int = None):
-            """
-            Recursive helper that:
-            - If node is a folder (typeCode=2), descends into children
-            - If node is a bookmark (typeCode=1), records it
-            - Merges folder name from the node’s title if relevant
-            """
+        # Start from the top-level object
+        # The JSON can have multiple top-level children, so parse them if present
+        # Some JSON backups store everything in data["children"][0], or data["children"]
+        # so you might have to handle that. For maximum safety:
+        if isinstance(data, dict) and "children" in data:
+            # parse top-level
+            roots = [data]
+        elif isinstance(data, list):
+            # Some backups store an array at the root
+            roots = data
+        else:
+            roots = []
+
+        # Depth-first walk with an explicit stack of (node, parent folder path).
+        # Children are pushed in reverse so bookmarks keep their file order.
+        # A folder's path string is built once when the folder is visited; all
+        # of its bookmarks share that same string object as their `folder`.
+        stack = [(node, None) for node in reversed(roots)]
+        # Bound once, the loop runs per node of the backup.
+        pop, push_all = stack.pop, stack.extend
+        add_bookmark = bookmarks.append
+        construct = Bookmark.model_construct
+        while stack:
+            node, parent_folder = pop()
             node_type = node.get("typeCode")
             node_title = node.get("title") or ""
 
             if node_type == 2:
                 # It's a folder/container
-                # Some top-level items may have 'root' like 'placesRoot', etc.
-                # You can decide to skip or rename these if you want.
                 # If this is a known built-in root folder, skip adding it to the path
-                if parent_folder in [
-                    "placesRoot",
-                    "bookmarksMenuFolder",
-                    "toolbarFolder",
-                    "unfiledBookmarksFolder",
-                    "mobileFolder",
-                    "unfiled",
-                    "menu",
-                ]:
+                if parent_folder in _BUILTIN_ROOT_FOLDERS:
                     new_folder_name = node_title  # don't add this to path
-                else:
+                elif parent_folder:
                     # Append this folder's title to the path
-                    if parent_folder:
-                        new_folder_name = f"{parent_folder}/{node_title}"
-                    else:
-                        new_folder_name = node_title
+                    new_folder_name = f"{parent_folder}/{node_title}"
+                else:
+                    new_folder_name = node_title
 
-                for child in node.get("children", []):
-                    recurse(child, new_folder_name, level + 1)
+                push_all((child, new_folder_name) for child in reversed(node.get("children", [])))
 
             elif node_type == 1:
                 # It's a bookmark
@@ -154,26 +148,14 @@ class FirefoxBookmarkAgent(ConnectedAgent):
                 if add_date:
                     add_date = str(add_date)
 
-                bm = Bookmark(
+                # The backup is written by Firefox itself, so the fields are
+                # taken as they are instead of being validated per bookmark.
+                add_bookmark(construct(
                     title=node_title,
                     url=url,
                     folder=parent_folder,
                     add_date=add_date
-                )
-                bookmarks.append(bm)
-
-        # Start recursion from the top-level object
-        # The JSON can have multiple top-level children, so parse them if present
-        # Some JSON backups store everything in data["children"][0], or data["children"]
-        # so you might have to handle that. For maximum safety:
-        if isinstance(data, dict) and "children" in data:
-            # parse top-level
-            recurse(data, None, 0)
-        else:
-            # Some backups store an array at the root
-            if isinstance(data, list):
-                for node in data:
-                    recurse(node, None, 0)
+                ))
 
         return bookmarks
 
@@ -1,4 +1,5 @@
 import os
+from operator import attrgetter
 
 from atomic_agents.lib.base.base_tool import BaseToolConfig
 from pydantic import Field
@@ -8,6 +9,9 @@ from AgentBookmarks.FirefoxBookmarkAgent import FirefoxBookmarksOutput
 from AgentFramework.core.ConnectedAgent import ConnectedAgent
 from AgentFramework.core.NullSchema import NullSchema
 
+# Fetches the fields of a bookmark entry in one C level call.
+_BOOKMARK_FIELDS = attrgetter("title", "url", "folder", "add_date")
+
 
 # ---------------------------------------------------------------------
 # Agent Configuration
@@ -45,6 +49,9 @@ class FirefoxBookmarkStorageAgent(ConnectedAgent):
         """
         super().__init__(config, uuid)
         self.config: FirefoxBookmarkStorageAgentConfig = config
+        self._output_dir = os.path.dirname(config.filename)
+        # The output directory is created on the first run only.
+        self._output_dir_ready = not self._output_dir
 
     def run(self, params: FirefoxBookmarksOutput) -> NullSchema:
         """
@@ -59,24 +66,21 @@ class FirefoxBookmarkStorageAgent(ConnectedAgent):
         """
         manager = BookmarkManager()
 
-        for bm in params.bookmarks:
-            # Use provided add_date or fallback to the current timestamp from the BookmarkManager.
-            add_date_str = bm.add_date or str(manager._current_timestamp())
-            # Use provided folder or default to empty string.
-            folder_path = bm.folder if bm.folder is not None else ""
-            manager.add_bookmark(
-                title=bm.title,
-                url=bm.url,
-                folder=folder_path,
-                add_date=add_date_str
-            )
-        # Serialize the complete bookmark tree to JSON.
-        json_data = manager.to_json()
-
+        # Use provided add_date or fallback to the current timestamp from the BookmarkManager,
+        # read once for the whole batch.
+        now_str = str(manager._current_timestamp())
+        # Use provided folder or default to empty string.
+        manager.bulk_add([
+            (title, url, folder if folder is not None else "", add_date or now_str)
+            for title, url, folder, add_date in map(_BOOKMARK_FIELDS, params.bookmarks)
+        ])
         # Ensure the output directory exists
-        os.makedirs(os.path.dirname(self.config.filename), exist_ok=True)
+        if not self._output_dir_ready:
+            os.makedirs(self._output_dir, exist_ok=True)
+            self._output_dir_ready = True
 
-        # Write JSON data to the file specified in the configuration.
-        with open(self.config.filename, "w", encoding="utf-8") as f:
-            f.write(json_data)
+        # Serialize the complete bookmark tree as UTF-8 JSON straight into the
+        # buffered file specified in the configuration.
+        with open(self.config.filename, "wb", buffering=1 << 20) as f:
+            manager.dump(f)
         return NullSchema()
@@ -1,6 +1,3 @@
-from typing import Type
-
-from atomic_agents.lib.base.base_io_schema import BaseIOSchema
 from openai import BaseModel
 from pydantic import Field
 
@@ -9,166 +6,12 @@ from AgentFramework.core.ConnectedAgent import ConnectedAgent
 from agent_config import DUMMY_LLM
 from agent_logging import logger
 from util.LLMSupport import LLMModel, LLMAgentConfig
-from util.SchemaUtils import generate_template_json
 
 
 # -----------------------------------------------------------------------------
 
-
-class GenerateCategoryForBookmarkOutput(BaseModel):
-    """
-    Schema representing the structured output of an AI-processed webpage bookmark,
-    with separate fields for main and subcategory.
-    """
-    hauptkategorie: str = Field(
-        ...,
-        description="Die übergeordnete Kategorie des Lesezeichens"
-    )
-    unterkategorie: str = Field(
-        ...,
-        description="Die spezifische Unterkategorie des Lesezeichens"
-    )
-    @staticmethod
-    def empty() -> "GenerateCategoryForBookmarkOutput":
-        return GenerateCategoryForBookmarkOutput(
-            hauptkategorie="",
-            unterkategorie="",
-        )
-
-
-class GenerateCategoryForBookmarkAgent(ConnectedAgent):
-    """
-    An agent that combines various inoputs to generate a bookmark vategory
-
-    Attributes:
-        input_schema (Type[BaseIOSchema]): Expected input schema.
-        output_schema (Type[BaseIOSchema]): Expected output schema.
-    """
-    input_schema = BookmarkMultiPortAggregatorOutput
-    output_schema = GenerateCategoryForBookmarkOutput
-
-
-    def __init__(self, config: LLMAgentConfig, uuid:str = 'default') -> None:
-        """
-        Initializes an LLMAgent instance with OpenAI API configuration.
-
-        Args:
-            config (LLMAgentConfig, optional): Configuration for the agent. Defaults to LLMAgentConfig().
-        """
-        super().__init__(config, uuid)
-
-        self.model: LLMModel = LLMModel(config, self.__class__.__name__)
-        self.model.delete_log_files()
-
-    def extract_categories_from_folder(self, folder_path: str) -> tuple[str, str]:
-        """
-        Takes a folder path like 'Main/Sub/Sub2', returns (Main, Sub - Sub2)
-        If no slash is present, returns (Main, '')
-        """
-
-        def smart_capitalize(text: str) -> str:
-            text = text.strip()
-            return text and text[0].upper() + text[1:] or ""
-
-        if not folder_path or not folder_path.strip():
-            return "", ""
-
-        folder_path = folder_path.strip()
-
-        if '/' in folder_path:
-            main_raw, sub_raw = folder_path.split('/', 1)
-            main_category = smart_capitalize(main_raw.replace("/", " - "))
-            sub_chunks = [smart_capitalize(chunk) for chunk in sub_raw.split("/") if chunk.strip()]
-            sub_category = " - ".join(sub_chunks)
-        else:
-            main_category = smart_capitalize(folder_path.replace("/", " - "))
-            sub_category = ""
-
-        return main_category, sub_category
-
-    def run(self, params: BookmarkMultiPortAggregatorOutput) -> GenerateCategoryForBookmarkOutput:
-        """
-        Processes the user input and returns a structured summary.
-        If `DUMMY_LLM` is enabled, returns dummy data.
-
-        Args:
-            user_input (Optional[BaseIOSchema], optional): The input data. Defaults to None.
-
-        Returns:
-            BaseIOSchema: The processed response from the LLM.
-        """
-
-        if DUMMY_LLM:
-            logger.info(f"LLM in DUMMY MODE for page {params.webpage.metadata.domain}")
-            result_object =  GenerateCategoryForBookmarkOutput(hauptkategorie=f"H:Kinder", unterkategorie=f"U:{params.bookmark.folder}")
-            return result_object
-        else:
-            logger.info(f"LLM call for page {params.webpage.metadata.domain} ")
-            sysprompt = None
-            userprompt = self._prompt(params)
-            try:
-                result_object, usage = self.model.hl_pydantic_completions(sysprompt, userprompt, targetType=self.output_schema, title='Step 1')
-                logger.info(f"LLM boomark result folder={params.bookmark.folder} --> '{result_object.hauptkategorie}/{result_object.unterkategorie}'")
-            except Exception as e:
-                logger.error(f"{self.__class__.__name__} failed for {params.bookmark.folder} with {e}")
-                if params.bookmark.folder:
-                    main_category, sub_category = self.extract_categories_from_folder(params.bookmark.folder)
-                    result_object = GenerateCategoryForBookmarkOutput(hauptkategorie=main_category,unterkategorie=sub_category)
-                else:
-                    result_object = GenerateCategoryForBookmarkOutput.empty()
-            return result_object
-
-
-
-        return GenerateCategoryForBookmarkOutput.empty()
-
-    def _create_data_for_llm(self, item):
-        output = []
-
-        # Originales Lesezeichen
-        output.append("Originaler Lesezeichen Titel: " + str(item.bookmark.title))
-        # output.append("Originale URL: " + str(item.bookmark.url))
-        output.append("Originaler Lesezeichen Ordner: " + str(item.bookmark.folder))
-
-        if not item.webpage.error:
-            # LLM-Zusammenfassung
-            output.append("Webseiten Informationen:")
-            if item.llm.ist_gueltig:
-                output.append("Titel: " + str(item.llm.titel))
-                output.append("Hauptkategorie: " + str(item.llm.kategorie))
-                output.append("Unterkategorie: " + str(item.llm.unterkategorie))
-                output.append("Schlagwörter: " + str(item.llm.schlagwoerter))
-                output.append("Beschreibung: " + str(item.llm.beschreibung))
-            #output.append("LLM Ist gültig: " + str(item.llm.ist_gueltig))
-            else:
-                output.append("Webseite Titel: " + str(item.webpage.metadata.title))
-                output.append("Webseite Autor: " + str(item.webpage.metadata.author))
-                output.append("Webseite Beschreibung: " + str(item.webpage.metadata.description))
-                # output.append("Webseite Fehlerstatus: " + str(item.webpage.error if item.webpage.error else "Kein Fehler"))
-
-            # Webseitendaten
-            output.append("Domain: " + str(item.webpage.metadata.domain))
-            output.append("Webseite Seitenname: " + str(item.webpage.metadata.site_name))
-            #output.append("Webseite Titel: " + str(item.webpage.metadata.title))
-            #output.append("Webseite Autor: " + str(item.webpage.metadata.author))
-            #output.append("Webseite Beschreibung: " + str(item.webpage.metadata.description))
-            #output.append("Webseite Fehlerstatus: " + str(item.webpage.error if item.webpage.error else "Kein Fehler"))
-        else:
-            output.append("Originale URL: " + str(item.bookmark.url))
-            output.append("Die Zuordnung muss anhand des Titles, Ordners und der URL erfolgen ")
-
-        output.append(f"Der Ordner ({str(item.bookmark.folder)}) kann immer als Default für die Zuordnung dienen!" )
-
-        return output
-
-    def _prompt(self, item):
-
-        schema_dict = LLMModel.openai_schema(self.output_schema)
-        llm_schema = generate_template_json(schema_dict)
-
-        valid_bookmarks = self._create_data_for_llm(item)
-        folder =  item.bookmark.folder
-        user_prompt = f"""
+# Static parts of the categorization prompt around the bookmark data and the folder.
+_PROMPT_HEAD = """
         Du organisierst Browser-Lesezeichen in eine zweistufige Ordnerstruktur:
 
         <**Hauptkategorie**> / <**Unterkategorie**>
@@ -215,10 +58,10 @@ class GenerateCategoryForBookmarkAgent(ConnectedAgent):
         Tags: ["Sternenschweif", "Hörspiel", "Audiobuch", "Pony", "Kinderserie"]
 
         **Ausgabe:**
-        {{
+        {
             "hauptkategorie": "Evelyn",
             "unterkategorie": "Hörbücher – Kinder"
-        }}
+        }
 
         ---
 
@@ -230,10 +73,10 @@ class GenerateCategoryForBookmarkAgent(ConnectedAgent):
         Tags: ["Lampe", "LED", "Touch", "USB", "Kinderzimmer"]
 
         **Ausgabe:**
-        {{
+        {
             "hauptkategorie": "Technik",
             "unterkategorie": "Intelligente Beleuchtung"
-        }}
+        }
 
         ---
 
@@ -245,30 +88,32 @@ class GenerateCategoryForBookmarkAgent(ConnectedAgent):
         Tags: ["Politik", "Deutschland", "Tagesschau", "Nachrichten"]
 
         **Ausgabe:**
-        {{
+        {
             "hauptkategorie": "Nachrichten",
             "unterkategorie": "Deutschland"
-        }}
+        }
 
         ---
 
         Verarbeite nun das folgende Lesezeichen:
 
         ### Eingabe-Lesezeichen:
-        {valid_bookmarks}
+        """
+_PROMPT_MID = """
         
         ### Eingabe Verzeichnis (das ursprüngliche Lesezeichenverzeichnis und hat hohe Priorität):
-        {folder}
+        """
+_PROMPT_TAIL = """
         
         Dies Lesezeichenverzeichnis ist wichtig zur Analyse ob das Lesezeichen einen Benutzter zugeordnet war.
         Dieses ist auch wichtig falls keine weiteren Informationen über die Webseite vorliegen.
         In dem Fall muss die neue Hauptkategorie dem Benutzter entsprechen und darf nicht geändert werden!
 
         ### Ausgabeschema:
-        {{
+        {
             "hauptkategorie": "<Hauptkategorie>",
             "unterkategorie": "<Unterkategorie>"
-        }}
+        }
 
         Die Ausgabe muss **reines JSON** sein, exakt nach diesem Schema:
         - Keine erklärenden Texte davor oder danach
@@ -278,7 +123,195 @@ class GenerateCategoryForBookmarkAgent(ConnectedAgent):
         Beginne jetzt mit der Generierung:
         """
 
-        return user_prompt
+
+def _smart_capitalize(text: str) -> str:
+    """Strip the text and upper-case its first character only."""
+    text = text.strip()
+    return text[:1].upper() + text[1:]
+
+
+class GenerateCategoryForBookmarkOutput(BaseModel):
+    """
+    Schema representing the structured output of an AI-processed webpage bookmark,
+    with separate fields for main and subcategory.
+    """
+    hauptkategorie: str = Field(
+        ...,
+        description="Die übergeordnete Kategorie des Lesezeichens"
+    )
+    unterkategorie: str = Field(
+        ...,
+        description="Die spezifische Unterkategorie des Lesezeichens"
+    )
+    @staticmethod
+    def empty() -> "GenerateCategoryForBookmarkOutput":
+        """Shared empty result, must not be mutated (use model_copy)."""
+        return _EMPTY_CATEGORY_OUTPUT
+
+
+_EMPTY_CATEGORY_OUTPUT = GenerateCategoryForBookmarkOutput.model_construct(
+    hauptkategorie="",
+    unterkategorie="",
+)
+
+
+class GenerateCategoryForBookmarkAgent(ConnectedAgent):
+    """
+    An agent that combines various inoputs to generate a bookmark vategory
+
+    Attributes:
+        input_schema (Type[BaseIOSchema]): Expected input schema.
+        output_schema (Type[BaseIOSchema]): Expected output schema.
+    """
+    input_schema = BookmarkMultiPortAggregatorOutput
+    output_schema = GenerateCategoryForBookmarkOutput
+
+
+    def __init__(self, config: LLMAgentConfig, uuid:str = 'default') -> None:
+        """
+        Initializes an LLMAgent instance with OpenAI API configuration.
+
+        Args:
+            config (LLMAgentConfig, optional): Configuration for the agent. Defaults to LLMAgentConfig().
+        """
+        super().__init__(config, uuid)
+
+        self.model: LLMModel = LLMModel(config, self.__class__.__name__)
+        self.model.delete_log_files_once()
+
+    def extract_categories_from_folder(self, folder_path: str) -> tuple[str, str]:
+        """
+        Takes a folder path like 'Main/Sub/Sub2', returns (Main, Sub - Sub2)
+        If no slash is present, returns (Main, '')
+        """
+
+        if not folder_path:
+            return "", ""
+        folder_path = folder_path.strip()
+        if not folder_path:
+            return "", ""
+
+        main_raw, _, sub_raw = folder_path.partition("/")
+        main_category = _smart_capitalize(main_raw)
+        sub_category = " - ".join(_smart_capitalize(chunk) for chunk in sub_raw.split("/") if chunk.strip())
+
+        return main_category, sub_category
+
+    def run(self, params: BookmarkMultiPortAggregatorOutput) -> GenerateCategoryForBookmarkOutput:
+        """
+        Processes the user input and returns a structured summary.
+        If `DUMMY_LLM` is enabled, returns dummy data.
+
+        Args:
+            user_input (Optional[BaseIOSchema], optional): The input data. Defaults to None.
+
+        Returns:
+            BaseIOSchema: The processed response from the LLM.
+        """
+        if DUMMY_LLM:
+            return self._run_dummy(params)
+        return self._run_live(params)
+
+    def _run_dummy(self, params: BookmarkMultiPortAggregatorOutput) -> GenerateCategoryForBookmarkOutput:
+        logger.info(f"LLM in DUMMY MODE for page {params.webpage.metadata.domain}")
+        return GenerateCategoryForBookmarkOutput(hauptkategorie=f"H:Kinder", unterkategorie=f"U:{params.bookmark.folder}")
+
+    def _run_live(self, params: BookmarkMultiPortAggregatorOutput) -> GenerateCategoryForBookmarkOutput:
+        folder = params.bookmark.folder
+        logger.info(f"LLM call for page {params.webpage.metadata.domain} ")
+        sysprompt = None
+        userprompt = self._prompt(params)
+        try:
+            result_object, usage = self.model.hl_pydantic_completions(sysprompt, userprompt, targetType=self.output_schema, title='Step 1')
+        except Exception as e:
+            return self._failed(folder, e)
+        logger.info(f"LLM boomark result folder={folder} --> '{result_object.hauptkategorie}/{result_object.unterkategorie}'")
+        return result_object
+
+    async def aclose(self) -> None:
+        """
+        Close the async LLM client of the running event loop.
+        """
+        await self.model.aclose()
+
+    async def arun(self, params: BookmarkMultiPortAggregatorOutput) -> GenerateCategoryForBookmarkOutput:
+        """
+        Async version of `run`. The LLM calls are network bound, so the async
+        schedulers run the bookmarks of a step concurrently.
+        """
+        if DUMMY_LLM:
+            return self._run_dummy(params)
+        folder = params.bookmark.folder
+        logger.info(f"LLM async call for page {params.webpage.metadata.domain} ")
+        try:
+            result_object, usage = await self.model.ahl_pydantic_completions(None, self._prompt(params), targetType=self.output_schema, title='Step 1')
+        except Exception as e:
+            return self._failed(folder, e)
+        logger.info(f"LLM boomark result folder={folder} --> '{result_object.hauptkategorie}/{result_object.unterkategorie}'")
+        return result_object
+
+    def _failed(self, folder: str, e: Exception) -> GenerateCategoryForBookmarkOutput:
+        """Without an LLM result the categories are taken from the original folder."""
+        logger.error(f"{self.__class__.__name__} failed for {folder} with {e}")
+        if folder:
+            main_category, sub_category = self.extract_categories_from_folder(folder)
+            return GenerateCategoryForBookmarkOutput(hauptkategorie=main_category,unterkategorie=sub_category)
+        return GenerateCategoryForBookmarkOutput.empty()
+
+    def _create_data_for_llm(self, item) -> str:
+        """
+        Describe the bookmark and its webpage for the prompt, one "Label: value"
+        line per piece of information.
+        """
+        bookmark = item.bookmark
+        folder = bookmark.folder
+        # Originales Lesezeichen
+        lines = [
+            f"Originaler Lesezeichen Titel: {bookmark.title}",
+            f"Originaler Lesezeichen Ordner: {folder}",
+        ]
+
+        webpage = item.webpage
+        if not webpage.error:
+            metadata = webpage.metadata
+            llm = item.llm
+            # LLM-Zusammenfassung
+            lines.append("Webseiten Informationen:")
+            if llm.ist_gueltig:
+                tags = ", ".join(llm.schlagwoerter) if llm.schlagwoerter else ""
+                lines += (
+                    f"Titel: {llm.titel}",
+                    f"Hauptkategorie: {llm.kategorie}",
+                    f"Unterkategorie: {llm.unterkategorie}",
+                    f"Schlagwörter: {tags}",
+                    f"Beschreibung: {llm.beschreibung}",
+                )
+            else:
+                lines += (
+                    f"Webseite Titel: {metadata.title}",
+                    f"Webseite Autor: {metadata.author}",
+                    f"Webseite Beschreibung: {metadata.description}",
+                )
+
+            # Webseitendaten
+            lines += (
+                f"Domain: {metadata.domain}",
+                f"Webseite Seitenname: {metadata.site_name}",
+            )
+        else:
+            lines += (
+                f"Originale URL: {bookmark.url}",
+                "Die Zuordnung muss anhand des Titles, Ordners und der URL erfolgen ",
+            )
+
+        lines.append(f"Der Ordner ({folder}) kann immer als Default für die Zuordnung dienen!")
+
+        return "\n".join(lines)
+
+    def _prompt(self, item):
+        valid_bookmarks = self._create_data_for_llm(item)
+        folder = item.bookmark.folder
+        return "".join((_PROMPT_HEAD, valid_bookmarks, _PROMPT_MID, str(folder), _PROMPT_TAIL))
 
 
     def debug_categories(self, params: "BookmarkMultiPortAggregatorOutput") -> None:
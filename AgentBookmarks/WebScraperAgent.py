@@ -1,3 +1,8 @@
+import asyncio
+from typing import Optional, Tuple
+
+import aiohttp
+
 from AgentFramework.core.ConnectedAgent import ConnectedAgent
 
 from AtomicTools.webpage_scraper.tool.webpage_scraper import WebpageScraperTool, WebpageScraperToolInputSchema, \
@@ -5,6 +10,13 @@ from AtomicTools.webpage_scraper.tool.webpage_scraper import WebpageScraperTool,
 from agent_logging import logger
 
 
+# Result for missing or non-http URLs. Shared by all such results, do not modify.
+_EMPTY_RESULT = WebpageScraperToolOutputSchema(
+    content = "",
+    metadata=WebpageMetadata(title = "",author = "",description ="", site_name = "", domain = ""),
+    error = "No a valid URL")
+
+
 class WebScraperAgent(WebpageScraperTool, ConnectedAgent):
     """
     An agent that integrates the WebpageScraperTool with the ConnectedAgent framework.
@@ -30,11 +42,84 @@ class WebScraperAgent(WebpageScraperTool, ConnectedAgent):
 
 
     def run(self, params: WebpageScraperToolInputSchema) -> WebpageScraperToolOutputSchema:
-        if params.url is None:
-            logger.warn("No url provided")
-            return WebpageScraperToolOutputSchema(
-                content = "",
-                metadata=WebpageMetadata(title = "",author = "",description ="", site_name = "", domain = ""),
-                error = "No a valid URL")
-        else:
-            return super().run(params)
+        if not self._check_url(params):
+            return _EMPTY_RESULT
+        return super().run(params)
+
+    def _check_url(self, params: WebpageScraperToolInputSchema) -> bool:
+        url = params.url
+        # Only http(s) URLs are worth a scraping attempt.
+        if url is None or not str(url).startswith(("http://", "https://")):
+            logger.warning(f"No valid url provided: {url}")
+            return False
+        return True
+
+
+class HttpWebScraperAgent(WebScraperAgent):
+    """
+    WebScraperAgent that fetches the pages with aiohttp instead of the browser.
+    It has an async `arun`, so `step_all_async` and `step_all_pipelined` keep up
+    to `max_concurrent` requests in flight. Content that is only rendered by
+    JavaScript is missing, `run` still uses the browser.
+    """
+
+    def __init__(self, config: WebpageScraperToolConfig = WebpageScraperToolConfig(), max_concurrent: int = 16) -> None:
+        """
+        Args:
+            config (WebpageScraperToolConfig, optional): Configuration for the web scraper. Defaults to WebpageScraperToolConfig().
+            max_concurrent (int): Maximum number of concurrent requests.
+        """
+        super().__init__(config)
+        self.max_concurrent = max_concurrent
+        # Session and semaphore, only created when arun is used.
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _asession(self) -> Tuple[aiohttp.ClientSession, asyncio.Semaphore]:
+        # Both belong to one event loop, so every asyncio.run() gets its own.
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session_loop is not loop:
+            timeout = aiohttp.ClientTimeout(total=self.config.timeout)
+            headers = {"User-Agent": self.config.user_agent}
+            self._session = aiohttp.ClientSession(timeout=timeout, headers=headers)
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+            self._session_loop = loop
+        return self._session, self._semaphore
+
+    async def aclose(self) -> None:
+        """
+        Close the session of the running event loop.
+        """
+        session, loop = self._session, self._session_loop
+        self._session = self._semaphore = self._session_loop = None
+        # A session of another, finished loop cannot be closed from here
+        if session is not None and loop is asyncio.get_running_loop():
+            await session.close()
+
+    async def arun(self, params: WebpageScraperToolInputSchema) -> WebpageScraperToolOutputSchema:
+        """
+        Async version of `run`, fetches the page over plain HTTP.
+        """
+        if not self._check_url(params):
+            return _EMPTY_RESULT
+        session, semaphore = self._asession()
+        try:
+            async with semaphore:
+                html_content = await self._afetch_webpage(session, str(params.url))
+            return self._html_to_output(html_content, params)
+        except Exception as e:
+            return self._error_output(e)
+
+    async def _afetch_webpage(self, session: aiohttp.ClientSession, url: str) -> str:
+        """
+        Fetches the raw HTML of a page over plain HTTP (no browser rendering).
+        """
+        async with session.get(url) as response:
+            response.raise_for_status()
+            html = await response.text(errors="replace")
+        if len(html) > self.config.max_content_length:
+            if not self.config.trim_excessive_content:
+                raise ValueError(f"Content length exceeds maximum of {self.config.max_content_length} bytes")
+            html = html[:self.config.max_content_length]
+        return html
@@ -1,5 +1,7 @@
+import asyncio
+import re
 import textwrap
-from typing import Optional, List, Type
+from typing import Optional, List, Tuple, Type
 
 from atomic_agents.lib.base.base_io_schema import BaseIOSchema
 from atomic_agents.lib.components.system_prompt_generator import SystemPromptGenerator
@@ -10,8 +12,95 @@ from AgentFramework.core.ConnectedAgent import ConnectedAgent
 from AtomicTools.webpage_scraper.tool.webpage_scraper import WebpageMetadata
 from agent_config import DUMMY_LLM
 from agent_logging import logger, rich_console
+from util.LLMCache import LLMCache
 from util.LLMSupport import LLMModel, LLMAgentConfig
-from util.SchemaUtils import generate_template_json
+
+
+_UMLAUT_RE = re.compile("[öäü]")
+_UMLAUT_MAP = {"ö": "oe", "ä": "ae", "ü": "ue"}
+
+
+def _replace_umlaut(match: re.Match) -> str:
+    return _UMLAUT_MAP[match.group(0)]
+
+
+_WS_RE = re.compile(r"\s+")
+# Budget for the page content in the prompt.
+_MAX_CONTENT_CHARS = 8000
+
+
+def _prompt_content(content: str) -> str:
+    """
+    Collapse whitespace runs of the scraped page content and cut it to
+    _MAX_CONTENT_CHARS. Only a prefix of a few times the budget is scanned,
+    so huge pages are not copied as a whole.
+    """
+    return _WS_RE.sub(" ", content[:4 * _MAX_CONTENT_CHARS]).strip()[:_MAX_CONTENT_CHARS]
+
+
+# Prompt templates, dedented once at import and filled in with str.format.
+_USER_PROMPT_TEMPLATE = textwrap.dedent("""
+            ---
+            ### Eingabedaten:
+            {webpage}
+            ---
+
+            ### Ausgabeformat:
+            {llm_schema}
+            
+            # Regeln:
+            Es ist extrem wichtig, dass du sicher bist, dass die Webseite gültige Contentdaten
+            enthält. Nur der echte Content der webpage darf analysiert werden. Gibt es irgendeinen
+            Hinweis, dass die Eingabeseite eine Cookieseite, Bannerseite, Fehlerseite, techische Hinweisseite
+            ist, ist unbedingt ist_gueltig=False zu setzen.
+            Ist es unklar unbedingt auch ist_gueltig=False setzen. Es ist für die weitere Verarbeitung
+            extrem wichtig, dass keine false postiv klassifiziert werden. Mit false negative können
+            wir besser umgehen.
+            
+
+            Erzeuge nur deutschen Text.
+            Du darfst ausschließlich die JSON-Ausgabe im angegebenen Format erstellen.
+            Die JSON Keywords müssen identisch mit denen des Ausgabeformat übereinstimmen.
+            Die JSON Typen müssen korrekt sein, insb Listen und Strings müssen genau stimmen. Wenn die Strings
+            Anführungszeichen enthalten, müssen diese in der Ausgabe richtig gequoted werden.
+            Gib **keinen zusätzlichen Text** vor oder nach dem JSON aus.
+
+            Erstelle die Ausgabe jetzt und beginne mit {{
+""").strip()
+
+_INPUT_EN_TEMPLATE = textwrap.dedent("""
+        ## Webpage input:
+    
+        ### Metadata:
+        Title: {title}
+        Author: {author}
+        Description: {description}
+        Site Name: {site_name}
+        Domain: {domain}
+    
+        ### URL:
+        {url}
+    
+        ### Content:
+        {content}
+    """).strip()
+
+_INPUT_DE_TEMPLATE = textwrap.dedent("""
+        ## Webseiten-Eingabe:
+
+        ### Metadaten:
+        Titel: {title}
+        Autor: {author}
+        Beschreibung: {description}
+        Seitenname: {site_name}
+        Domain: {domain}
+
+        ### URL:
+        {url}
+
+        ### Inhalt:
+        {content}
+        """).strip()
 
 
 # -----------------------------------------------------------------------------
@@ -37,14 +126,24 @@ class BookmarkOutput(BaseModel):
 
     @staticmethod
     def empty() -> "BookmarkOutput":
-        return BookmarkOutput(
-            titel="",
-            kategorie="",
-            unterkategorie="",
-            schlagwoerter=[],
-            beschreibung="",
-            ist_gueltig=False
-        )
+        """Shared empty result, must not be mutated (use empty_titled for a copy)."""
+        return _EMPTY_BOOKMARK_OUTPUT
+
+    @staticmethod
+    def empty_titled(titel: str) -> "BookmarkOutput":
+        """Copy of the empty result with a title and its own keyword list."""
+        return _EMPTY_BOOKMARK_OUTPUT.model_copy(update={"titel": titel, "schlagwoerter": []})
+
+
+_EMPTY_BOOKMARK_OUTPUT = BookmarkOutput.model_construct(
+    titel="",
+    kategorie="",
+    unterkategorie="",
+    schlagwoerter=[],
+    beschreibung="",
+    ist_gueltig=False
+)
+
 
 class WebpageToCategoryAgent(ConnectedAgent):
     """
@@ -67,12 +166,34 @@ class WebpageToCategoryAgent(ConnectedAgent):
         super().__init__(config, uuid)
 
         self.model: LLMModel = LLMModel(config, self.__class__.__name__)
-        self.model.delete_log_files()
-
-
-
+        self.model.delete_log_files_once()
+
+        # Prompt parts that do not depend on the page, built once per agent.
+        self._llm_schema = LLMModel.schema_template(self.output_schema)
+        system_prompt_generator = SystemPromptGenerator(
+            background=[
+                "Dieser Assistent ist ein intelligenter Lesezeichen-Agent, der Webseiten analysiert, um Lesezeichen sinnvoll zu organisieren.",
+                "Er erhält eine Webseiten-URL mit Metadaten und Inhalt (als Text oder Markdown) und erstellt strukturierte Lesezeichen-Metadaten."
+            ],
+            steps=[
+                "Analysiere den Inhalt, um das Hauptthema und den Kontext der Seite zu verstehen.",
+                "Bestimme, ob es sich um eine echte Inhaltsseite handelt oder um eine leere Seite, Fehlerseite, Cookie-Hinweisseite, ... (Feld 'ist_gueltig' entsprechend setzen).",
+                "Leite eine passende Hauptkategorie ab (z.B. 'Programmierung', 'Design', 'Gesundheit' usw.) sowie eine spezifischere Unterkategorie.",
+                "Erstelle einen klaren und prägnanten Titel für das Lesezeichen.",
+                "Bestimme 3–6 Schlagwörter, die den Inhalt gut zusammenfassen und bei der Suche oder Filterung helfen.",
+                "Schreibe eine kurze Beschreibung der Seite (1–2 Sätze)."
+            ],
+            output_instructions=[
+                "Wichtig: Wenn die Webseite nicht gelesen werden kann oder Cookie oder Fehlerdaten enthält muss 'ist_gueltig' auf False gesetzt werden!",
+                "D.h. wenn es irgendein Hinweis gibt, dass der Eingabetext ist keine korrekten Webpage Inhaltsdaten (Cookie, Banner, Leer, ..) muss 'ist_gueltig' auf False gesetzt werden!",
+                "Die Ausgabe muss korrektes JSON gemäß der angegebenen Vorlage sein. Kein zusätzlicher Text vor oder nach dem JSON.",
+                "Alle Felder müssen beschreibend und nützlich für die Organisation einer persönlichen Wissensdatenbank oder Lesezeichenverwaltung sein."
+            ]
+        )
+        self._sysprompt = system_prompt_generator.generate_prompt()
 
-        #print("Prmot",self.sysprompt)
+        # Replies of earlier runs, keyed by model and prompts
+        self._cache = LLMCache(config.cache_file) if config.cache_file else None
 
 
 
@@ -87,149 +208,179 @@ class WebpageToCategoryAgent(ConnectedAgent):
         Returns:
             BaseIOSchema: The processed response from the LLM.
         """
-
-        error_status = params.webpage_error
-
         if DUMMY_LLM:
-            logger.info(f"LLM in DUMMY MODE for page {params.metadata.domain}")
-            result_object = BookmarkOutput(titel=params.metadata.title,
-                                           kategorie="Test42",
-                                           unterkategorie="keine",
-                                           schlagwoerter=[],
-                                           beschreibung="Dummy bookmark categorizaion",
-                                           ist_gueltig=True)
-
-            #raise Exception("LL;  TEST")
+            return self._run_dummy(params)
+        return self._run_live(params)
+
+    def _run_dummy(self, params: WebpageToCategoryInput) -> BaseIOSchema:
+        logger.info(f"LLM in DUMMY MODE for page {params.metadata.domain}")
+        result_object = BookmarkOutput(titel=params.metadata.title,
+                                       kategorie="Test42",
+                                       unterkategorie="keine",
+                                       schlagwoerter=[],
+                                       beschreibung="Dummy bookmark categorizaion",
+                                       ist_gueltig=True)
+
+        #raise Exception("LL;  TEST")
+        return result_object
+
+    def _run_live(self, params: WebpageToCategoryInput) -> BaseIOSchema:
+        result_object, user_prompt, cache_key = self._prepare(params)
+        if result_object is not None:
             return result_object
+        try:
+            result_object, usage = self.model.hl_pydantic_completions(self._sysprompt,
+                                                                      user_prompt,
+                                                                      targetType=self.output_schema,
+                                                                      fix_function=self.fix_function,
+                                                                      title='Step Bookmark LLM')
+        except Exception as e:
+            return self._failed(params, e)
+        return self._finish(params, cache_key, result_object)
+
+    async def aclose(self) -> None:
+        """
+        Close the async LLM client of the running event loop.
+        """
+        await self.model.aclose()
 
-        if error_status:
-            logger.info(f"LLM omitting page {params.metadata.domain} due to error reading it {error_status}")
-            result_object = BookmarkOutput.empty()
-            result_object.ist_gueltig = False
+    async def arun(self, params: WebpageToCategoryInput) -> BaseIOSchema:
+        """
+        Async version of `run`, the LLM request does not block the event loop.
+        """
+        if DUMMY_LLM:
+            return self._run_dummy(params)
+        result_object, user_prompt, cache_key = self._prepare(params)
+        if result_object is not None:
             return result_object
-        else:
-            logger.info(f"LLM call for page {params.metadata.domain} ")
-
-            schema_dict = LLMModel.openai_schema(self.output_schema)
-            llm_schema = generate_template_json(schema_dict)
+        try:
+            result_object, usage = await self.model.ahl_pydantic_completions(self._sysprompt,
+                                                                             user_prompt,
+                                                                             targetType=self.output_schema,
+                                                                             fix_function=self.fix_function,
+                                                                             title='Step Bookmark LLM')
+        except Exception as e:
+            return self._failed(params, e)
+        return self._finish(params, cache_key, result_object)
+
+    async def arun_batch(self, batch: List[WebpageToCategoryInput]) -> List[BaseIOSchema]:
+        """
+        Categorizes the pages of one `step_all_async` round. With `use_batch_api`
+        set and an OpenAI model they go through `submit_batch` in a worker thread,
+        otherwise through concurrent `arun` calls.
 
-            webpage = self.format_bookmark_input_de(params)
+        Args:
+            batch (List[WebpageToCategoryInput]): The pages to categorize.
 
-            user_prompt =  textwrap.dedent(f"""
-            ---
-            ### Eingabedaten:
-            {webpage}
-            ---
+        Returns:
+            List[BaseIOSchema]: The results, in input order.
+        """
+        if self.config.use_batch_api and self.model.hasBatchApi() and not DUMMY_LLM:
+            return await asyncio.to_thread(self.submit_batch, batch)
+        return await super().arun_batch(batch)
 
-            ### Ausgabeformat:
-            {llm_schema}
-            
-            # Regeln:
-            Es ist extrem wichtig, dass du sicher bist, dass die Webseite gültige Contentdaten
-            enthält. Nur der echte Content der webpage darf analysiert werden. Gibt es irgendeinen
-            Hinweis, dass die Eingabeseite eine Cookieseite, Bannerseite, Fehlerseite, techische Hinweisseite
-            ist, ist unbedingt ist_gueltig=False zu setzen.
-            Ist es unklar unbedingt auch ist_gueltig=False setzen. Es ist für die weitere Verarbeitung
-            extrem wichtig, dass keine false postiv klassifiziert werden. Mit false negative können
-            wir besser umgehen.
-            
+    def submit_batch(self, inputs: List[WebpageToCategoryInput]) -> List[BaseIOSchema]:
+        """
+        Categorizes the pages through the OpenAI batch API, at half the price of
+        single calls. Blocks until the batch is done.
 
-            Erzeuge nur deutschen Text.
-            Du darfst ausschließlich die JSON-Ausgabe im angegebenen Format erstellen.
-            Die JSON Keywords müssen identisch mit denen des Ausgabeformat übereinstimmen.
-            Die JSON Typen müssen korrekt sein, insb Listen und Strings müssen genau stimmen. Wenn die Strings
-            Anführungszeichen enthalten, müssen diese in der Ausgabe richtig gequoted werden.
-            Gib **keinen zusätzlichen Text** vor oder nach dem JSON aus.
+        Args:
+            inputs (List[WebpageToCategoryInput]): The pages to categorize.
 
-            Erstelle die Ausgabe jetzt und beginne mit {{
-            """).strip()
-
-            system_prompt_generator = SystemPromptGenerator(
-                background=[
-                    "Dieser Assistent ist ein intelligenter Lesezeichen-Agent, der Webseiten analysiert, um Lesezeichen sinnvoll zu organisieren.",
-                    "Er erhält eine Webseiten-URL mit Metadaten und Inhalt (als Text oder Markdown) und erstellt strukturierte Lesezeichen-Metadaten."
-                ],
-                steps=[
-                    "Analysiere den Inhalt, um das Hauptthema und den Kontext der Seite zu verstehen.",
-                    "Bestimme, ob es sich um eine echte Inhaltsseite handelt oder um eine leere Seite, Fehlerseite, Cookie-Hinweisseite, ... (Feld 'ist_gueltig' entsprechend setzen).",
-                    "Leite eine passende Hauptkategorie ab (z.B. 'Programmierung', 'Design', 'Gesundheit' usw.) sowie eine spezifischere Unterkategorie.",
-                    "Erstelle einen klaren und prägnanten Titel für das Lesezeichen.",
-                    "Bestimme 3–6 Schlagwörter, die den Inhalt gut zusammenfassen und bei der Suche oder Filterung helfen.",
-                    "Schreibe eine kurze Beschreibung der Seite (1–2 Sätze)."
-                ],
-                output_instructions=[
-                    "Wichtig: Wenn die Webseite nicht gelesen werden kann oder Cookie oder Fehlerdaten enthält muss 'ist_gueltig' auf False gesetzt werden!",
-                    "D.h. wenn es irgendein Hinweis gibt, dass der Eingabetext ist keine korrekten Webpage Inhaltsdaten (Cookie, Banner, Leer, ..) muss 'ist_gueltig' auf False gesetzt werden!",
-                    "Die Ausgabe muss korrektes JSON gemäß der angegebenen Vorlage sein. Kein zusätzlicher Text vor oder nach dem JSON.",
-                    "Alle Felder müssen beschreibend und nützlich für die Organisation einer persönlichen Wissensdatenbank oder Lesezeichenverwaltung sein."
-                ]
-            )
-
-            sysprompt = system_prompt_generator.generate_prompt()
-
-            try:
-                result_object, usage = self.model.hl_pydantic_completions(sysprompt,
-                                                                 user_prompt,
-                                                                 targetType=self.output_schema,
-                                                                 fix_function=self.fix_function,
-                                                                 title='Step Bookmark LLM')
-                rich_console.print(f"Processing LLM url {params.metadata.domain}, Valid: {result_object.ist_gueltig}")
-            except Exception as e:
-                logger.error(f"{self.__class__.__name__} failed with E11  {e}")
-                result_object = BookmarkOutput(titel=params.metadata.title,
-                                               kategorie="",
-                                               unterkategorie="",
-                                               schlagwoerter=[],
-                                               beschreibung="",
-                                               ist_gueltig=False)
+        Returns:
+            List[BaseIOSchema]: The results, in input order.
+        """
+        results: List[BaseIOSchema] = [BookmarkOutput.empty()] * len(inputs)
+        # Pages that could not be read are not sent to the LLM.
+        pending = [i for i, params in enumerate(inputs) if not params.webpage_error]
+        if not pending:
+            return results
+        prompts = [(self._sysprompt, self._user_prompt(inputs[i])) for i in pending]
+        try:
+            replies = self.model.batch_pydantic_completions(prompts,
+                                                            targetType=self.output_schema,
+                                                            fix_function=self.fix_function,
+                                                            title='Step Bookmark LLM')
+        except Exception as e:
+            logger.error(f"{self.__class__.__name__} batch failed with {e}")
+            replies = [None] * len(pending)
+        for i, reply in zip(pending, replies):
+            if reply is None:
+                reply = BookmarkOutput.empty_titled(inputs[i].metadata.title)
+            results[i] = reply
+        return results
+
+    def _prepare(self, params: WebpageToCategoryInput) -> Tuple[Optional[BookmarkOutput], Optional[str], Optional[str]]:
+        """
+        Steps of `run` and `arun` before the LLM call.
 
-            return result_object
+        Returns:
+            The result if no LLM call is needed (unreadable page or cached reply),
+            otherwise None, plus the user prompt and the cache key.
+        """
+        error_status = params.webpage_error
+        if error_status:
+            logger.info(f"LLM omitting page {params.metadata.domain} due to error reading it {error_status}")
+            return BookmarkOutput.empty(), None, None
+        logger.info(f"LLM call for page {params.metadata.domain} ")
+        user_prompt = self._user_prompt(params)
+        cache_key, result_object = self._cached(user_prompt)
+        return result_object, user_prompt, cache_key
+
+    def _finish(self, params: WebpageToCategoryInput, cache_key: Optional[str], result_object: BookmarkOutput) -> BookmarkOutput:
+        rich_console.print(f"Processing LLM url {params.metadata.domain}, Valid: {result_object.ist_gueltig}")
+        self._store(cache_key, result_object)
+        return result_object
+
+    def _failed(self, params: WebpageToCategoryInput, e: Exception) -> BookmarkOutput:
+        logger.error(f"{self.__class__.__name__} failed with E11  {e}")
+        return BookmarkOutput.empty_titled(params.metadata.title)
+
+    def _cached(self, user_prompt: str) -> Tuple[Optional[str], Optional[BookmarkOutput]]:
+        """Cache key of the request and the reply of an earlier run, if any."""
+        if self._cache is None:
+            return None, None
+        key = LLMCache.key(self.model.name(), self._sysprompt, user_prompt)
+        value = self._cache.get(key)
+        if value is None:
+            return key, None
+        logger.info("LLM reply taken from cache")
+        return key, BookmarkOutput.model_validate_json(value)
+
+    def _store(self, cache_key: Optional[str], result_object: BookmarkOutput) -> None:
+        if cache_key is not None:
+            self._cache.put(cache_key, result_object.model_dump_json())
+
+    def _user_prompt(self, params: WebpageToCategoryInput) -> str:
+        webpage = self.format_bookmark_input_de(params)
+        return _USER_PROMPT_TEMPLATE.format(webpage=webpage, llm_schema=self._llm_schema)
 
     @staticmethod
     def fix_function(text: str) -> str:
-        text = text.replace('ö', 'oe')
-        text = text.replace('ä', 'ae')
-        text = text.replace('ü', 'ue')
-
-        return text
+        # Replace ö, ä, ü by oe, ae, ue in a single pass.
+        return _UMLAUT_RE.sub(_replace_umlaut, text)
 
     def format_bookmark_input_en(self, params: WebpageToCategoryInput) -> str:
         metadata = params.metadata
-        input_str = textwrap.dedent(f"""
-        ## Webpage input:
-    
-        ### Metadata:
-        Title: {metadata.title}
-        Author: {metadata.author or "N/A"}
-        Description: {metadata.description or "N/A"}
-        Site Name: {metadata.site_name or "N/A"}
-        Domain: {metadata.domain}
-    
-        ### URL:
-        {params.url}
-    
-        ### Content:
-        {params.content}
-    """).strip()
-        return input_str
+        return _INPUT_EN_TEMPLATE.format(
+            title=metadata.title,
+            author=metadata.author or "N/A",
+            description=metadata.description or "N/A",
+            site_name=metadata.site_name or "N/A",
+            domain=metadata.domain,
+            url=params.url,
+            content=_prompt_content(params.content),
+        )
 
     def format_bookmark_input_de(self, params: WebpageToCategoryInput) -> str:
         metadata = params.metadata
-        input_str = textwrap.dedent(f"""
-        ## Webseiten-Eingabe:
-
-        ### Metadaten:
-        Titel: {metadata.title}
-        Autor: {metadata.author or "N/A"}
-        Beschreibung: {metadata.description or "N/A"}
-        Seitenname: {metadata.site_name or "N/A"}
-        Domain: {metadata.domain}
-
-        ### URL:
-        {params.url}
-
-        ### Inhalt:
-        {params.content}
-        """).strip()
-        return input_str
+        return _INPUT_DE_TEMPLATE.format(
+            title=metadata.title,
+            author=metadata.author or "N/A",
+            description=metadata.description or "N/A",
+            site_name=metadata.site_name or "N/A",
+            domain=metadata.domain,
+            url=params.url,
+            content=_prompt_content(params.content),
+        )
 
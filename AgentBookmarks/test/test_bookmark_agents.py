@@ -1,6 +1,6 @@
-import json
 import logging
 import os
+import re
 import time
 from typing import List
 
@@ -22,7 +22,7 @@ from AgentBookmarks.FirefoxBookmarkAgent import FirefoxBookmarkAgentConfig, Fire
 from AgentBookmarks.FirefoxBookmarkStorageAgent import FirefoxBookmarkStorageAgent, FirefoxBookmarkStorageAgentConfig
 from AgentBookmarks.GenerateCategoryForBookmarkAgent import GenerateCategoryForBookmarkAgent, \
     GenerateCategoryForBookmarkOutput
-from AgentBookmarks.WebScraperAgent import WebScraperAgent
+from AgentBookmarks.WebScraperAgent import WebScraperAgent, HttpWebScraperAgent
 from AgentFramework.core.AgentScheduler import AgentScheduler
 from AgentFramework.support.CounterAgent import CounterAgent, CounterSchema, CounterAgentConfig
 from AgentFramework.support.LoadJsonAgent import LoadJsonAgentConfig, LoadJsonAgent
@@ -31,12 +31,18 @@ from AgentFramework.support.SaveJsonAgent import SaveJsonAgentConfig, SaveJsonAg
 from AtomicTools.browser_handling.BrowserManager import get_browser_manager
 from AtomicTools.webpage_scraper.tool.webpage_scraper import WebpageScraperToolConfig, WebpageScraperToolInputSchema, \
     WebpageScraperToolOutputSchema
-from agent_config import DUMMY_WEB
+from agent_config import DUMMY_WEB, HTTP_WEB
 from agent_logging import rich_console
+from util import fast_json
 from util.LLMSupport import LLMAgentConfig, Provider
 
 # Set up root logger once
 logging.basicConfig(level=logging.INFO)
+log = logging.getLogger(__name__)
+
+# Built once: the cheap regex rejects obvious non-http URLs before pydantic validates them.
+_URL_ADAPTER = TypeAdapter(HttpUrl)
+_URL_RE = re.compile(r"^https?://[^\s]+$")
 
 def main():
 
@@ -125,7 +131,10 @@ def main():
 
 
     # Load Firefox
-    firefoxLoadAgent = LoadJsonAgent(config=LoadJsonAgentConfig(filename=f"{INPUT_DIR}/load_bookmarks.json", model_class=FirefoxBookmarksOutput))
+    firefoxLoadAgent = LoadJsonAgent(config=LoadJsonAgentConfig(filename=f"{INPUT_DIR}/load_bookmarks.json",
+                                                                model_class=FirefoxBookmarksOutput,
+                                                                max_items=SHORT_LOOP_CNT + 1 if SHORT_LOOP_CNT else None, # DEBUG
+                                                                items_field="bookmarks"))
 
     # Firefox
     firefoxBookmarkAgent = FirefoxBookmarkAgent(config=FirefoxBookmarkAgentConfig())
@@ -138,18 +147,19 @@ def main():
     webScraperConfig = WebpageScraperToolConfig(trim_excessive_content=True, max_content_length=100000)
     if DUMMY_WEB:
         webScraperAgent = DummyWebScraperAgent(config=webScraperConfig)
+    elif HTTP_WEB:
+        webScraperAgent = HttpWebScraperAgent(config=webScraperConfig)
     else:
         webScraperAgent = WebScraperAgent(config=webScraperConfig)
 
     # Save web
     # webSaveAgent = SaveJsonAgent(config=SaveJsonAgentConfig(filename=f"{OUTPUT_DIR}/save_web.json", use_uuid=True))
 
-    webScraperSaveAgent = SaveJsonAgent(config=SaveJsonAgentConfig(filename=f"{DEBUG_DIR}/save_websrcape.json", use_uuid=True))
+    webScraperSaveAgent = SaveJsonAgent(config=SaveJsonAgentConfig(filename=f"{DEBUG_DIR}/save_websrcape.jsonl", append_mode=True))
 
 
     llmAgent = WebpageToCategoryAgent(config=llmOllamaConfig)
-    llmSaveAgent = SaveJsonAgent(config=SaveJsonAgentConfig(filename=f"{DEBUG_DIR}/save_llm.json", use_uuid=True))
-    sinkLLMAgent: ListCollectionAgent = ListCollectionAgent(BaseToolConfig(), uuid='collect_llms')
+    llmSaveAgent = SaveJsonAgent(config=SaveJsonAgentConfig(filename=f"{DEBUG_DIR}/save_llm.jsonl", append_mode=True))
     counterLLMAgent: CounterAgent = CounterAgent(CounterAgentConfig(counter_fields=['valid','overall']))
     counterSaveAgent = SaveJsonAgent(config=SaveJsonAgentConfig(filename=f"{DEBUG_DIR}/save_counter_llm_valid.json", use_uuid=False))
 
@@ -190,22 +200,21 @@ def main():
         """Converts each result into an individual WebpageScraperToolInputSchema instance."""
         results = []
         for i, result in enumerate(output_msg.bookmarks):
-            if SHORT_LOOP_CNT and i > SHORT_LOOP_CNT: # DEBUG
-                break
+            if not result.url or not _URL_RE.match(result.url):
+                log.debug("[%d] Not a http URL '%s' -> Igoring page", i, result.url)
+                results.append(WebpageScraperToolInputSchema(url=None, include_links=False))
+                continue
             try:
-                validated_url = TypeAdapter(HttpUrl).validate_python(result.url)
+                validated_url = _URL_ADAPTER.validate_python(result.url)
                 scraper_input = WebpageScraperToolInputSchema(url=validated_url, include_links=False)
             except Exception as e:
-                print(f"[{i}] Validation failed for URL '{result.url}': {e} -> Igoring page")
+                log.debug("[%d] Validation failed for URL '%s': %s -> Igoring page", i, result.url, e)
                 scraper_input = WebpageScraperToolInputSchema(url=None, include_links=False)
             results.append(scraper_input)
         return results
 
     def transform_bookmarks_to_aggregator(output_msg: FirefoxBookmarksOutput) -> List[Bookmark]:
         """Converts each result into an individual WebpageScraperToolInputSchema instance."""
-        if SHORT_LOOP_CNT: # DEBUG
-            result = output_msg.bookmarks[:SHORT_LOOP_CNT + 1]
-            return result
         return output_msg.bookmarks
 
     def transform_webscraper_to_llm(web_page: WebpageScraperToolOutputSchema) -> WebpageToCategoryInput:
@@ -249,8 +258,7 @@ def main():
     categoryAgent.connectTo(mergingAgentCats, to_input=GenerateCategoryForBookmarkOutput)
     mergingAgentCats.connectTo(sinkAgent_CollectCats)
 
-    llmAgent.connectTo(sinkLLMAgent, pre_transformer=transform_llm_to_counter)
-    sinkLLMAgent.connectTo(counterLLMAgent)
+    llmAgent.connectTo(counterLLMAgent, pre_transformer=transform_llm_to_counter)
     counterLLMAgent.connectTo(counterSaveAgent)
 
     sinkAgent_CollectCats.connectTo(catGeneralizeAgent)
@@ -278,7 +286,6 @@ def main():
     scheduler.add_agent(webScraperSaveAgent, skipAgent=True)
     scheduler.add_agent(llmAgent)
     scheduler.add_agent(llmSaveAgent)
-    scheduler.add_agent(sinkLLMAgent)
     scheduler.add_agent(counterLLMAgent)
     scheduler.add_agent(counterSaveAgent)
 
@@ -305,13 +312,15 @@ def main():
                               entry_exit_fillcolor='pink',
                               show_schemas=True,
                               schema_fillcolor='moccasin')
-    printer.print_ascii(scheduler.agents)
+    if os.getenv("PIPELINE_DEBUG"):
+        printer.print_ascii(scheduler.agents)
     printer.save_as_png(scheduler.agents, 'r:/pipeline_bookmarks_large.png')
     printer = PipelinePrinter(is_ortho=False,
                               direction='TB',
                               fillcolor='blue',
                               entry_exit_fillcolor='pink',)
-    printer.print_ascii(scheduler.agents)
+    if os.getenv("PIPELINE_DEBUG"):
+        printer.print_ascii(scheduler.agents)
     printer.save_as_png(scheduler.agents, 'r:/pipeline_bookmarks.png')
     #return
 
@@ -322,9 +331,8 @@ def main():
 
     if RESTORE_DIR:
         rich_console.print(f"[red]Restoring scheduler from {RESTORE_DIR}[/red]")
-        scheduler.load_agents(RESTORE_DIR)
-        scheduler.load_state(RESTORE_DIR)
-        print(json.dumps(scheduler.queque_sizes(), indent=4))
+        scheduler.load_scheduler(RESTORE_DIR)
+        print(fast_json.dumps(scheduler.queque_sizes(), indent=True).decode("utf-8"))
         rich_console.print(f"[red]Restoring scheduler done[/red]")
 
     else:
@@ -339,12 +347,15 @@ def main():
     # ------------------------------------------------------------------------------------------------
     # Loop all
     start_time = time.perf_counter()
-    scheduler.step_all()
+    # Scraping continues while the LLM requests are running
+    scheduler.freeze()
+    scheduler.step_all_pipelined()
     end_time = time.perf_counter()
     execution_time = end_time - start_time
     print(f"Execution time: {execution_time:.2f} seconds")
 
     # at end of main
+    scheduler.close()
     get_browser_manager().close()
 
 
@@ -0,0 +1,65 @@
+# tests/test_bookmark_manager.py
+import io
+import json
+import unittest
+
+from AgentBookmarks.BookmarkManager import BookmarkManager
+
+ENTRIES = [
+    ("Python", "https://www.python.org", "Programmierung", "1695579970525000"),
+    ("PEP 8", "https://peps.python.org/pep-0008/", "Programmierung/Python", "1695579970526000"),
+    ("Rust", "https://www.rust-lang.org", "Programmierung", "1695579970527000"),
+    ("Sternenschweif – Wikipedia", "https://de.wikipedia.org/wiki/Sternenschweif", "Evelyn/Hobby", "1695579970528000"),
+    ("Docs", "https://docs.python.org", "Programmierung/Python", "1695579970529000"),
+    ("Ohne Ordner", "https://example.org", "Programmierung", "1695579970530000"),
+]
+
+
+def comparable(node: dict) -> dict:
+    """The node without the random guids and the creation time of new folders."""
+    new_folder = node.get("typeCode") == 2 and node.get("root") is None
+    result = {}
+    for key, value in node.items():
+        if key == "guid" or (new_folder and key in ("dateAdded", "lastModified")):
+            continue
+        result[key] = [comparable(child) for child in value] if key == "children" else value
+    return result
+
+
+class TestBookmarkManager(unittest.TestCase):
+
+    def test_bulk_add_matches_add_bookmark(self):
+        single = BookmarkManager()
+        for entry in ENTRIES:
+            single.add_bookmark(*entry)
+        bulk = BookmarkManager()
+        bulk.bulk_add(ENTRIES)
+
+        self.assertEqual(comparable(json.loads(bulk.to_json())), comparable(json.loads(single.to_json())))
+
+    def test_bulk_add_continues_existing_folders(self):
+        single = BookmarkManager()
+        for entry in ENTRIES + ENTRIES[:2]:
+            single.add_bookmark(*entry)
+        bulk = BookmarkManager()
+        bulk.bulk_add(ENTRIES)
+        bulk.bulk_add(iter(ENTRIES[:2]))
+
+        self.assertEqual(comparable(json.loads(bulk.to_json())), comparable(json.loads(single.to_json())))
+
+    def test_serializations_agree(self):
+        manager = BookmarkManager()
+        manager.bulk_add(ENTRIES)
+        text = manager.to_json()
+        buffer = io.BytesIO()
+        manager.dump(buffer)
+
+        self.assertEqual(manager.to_json_bytes(), text.encode("utf-8"))
+        self.assertEqual(buffer.getvalue(), text.encode("utf-8"))
+        compact = io.BytesIO()
+        manager.dump(compact, compact=True)
+        self.assertEqual(json.loads(compact.getvalue()), json.loads(text))
+
+
+if __name__ == "__main__":
+    unittest.main()
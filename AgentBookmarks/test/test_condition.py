@@ -13,6 +13,7 @@ from agent_logging import rich_console
 
 # Set up root logger once
 logging.basicConfig(level=logging.INFO)
+log = logging.getLogger(__name__)
 
 def main():
 
@@ -38,13 +39,13 @@ def main():
     # Message transformation
     def numbers_condition(msg: CountNumbersAgentSchema) -> bool:
         """Check condition."""
-        print("Check condition ",msg, msg.number % 2 == 0)
+        log.debug("Check condition %s %s", msg, msg.number % 2 == 0)
         if msg.number % 2 == 0:
             return False
         return True
     def transform_numbers_to_counter(data: CountNumbersAgentSchema) -> CounterSchema:
         """Converts result oto counter."""
-        print("Got data ",data)
+        log.debug("Got data %s", data)
         return CounterSchema(counts={
             "count": 1
         })
@@ -70,9 +71,10 @@ def main():
                               fillcolor='blue',
                               entry_exit_fillcolor='yellow',
                               )
-    printer.print_ascii(scheduler.agents)
-    printer.to_dot(scheduler.agents,)
+    if os.getenv("PIPELINE_DEBUG"):
+        printer.print_ascii(scheduler.agents)
     printer.save_as_png(scheduler.agents, 'r:/pipeline_condition.png')
+    printer.save_as_mermaid(scheduler.agents, 'r:/pipeline_condition.mmd')
 
     printer = PipelinePrinter(is_ortho=False,
                               direction='LR',
@@ -80,16 +82,11 @@ def main():
                               entry_exit_fillcolor='yellow',
                               show_schemas=True,
                               schema_fillcolor='moccasin')
-    printer.print_ascii(scheduler.agents)
-    printer.to_dot(scheduler.agents,)
+    if os.getenv("PIPELINE_DEBUG"):
+        printer.print_ascii(scheduler.agents)
     printer.save_as_png(scheduler.agents, 'r:/pipeline_condition_large.png')
     printer.save_as_dot(scheduler.agents, 'r:/pipeline_condition_large.dot')
-
-
-    printer = PipelinePrinter(direction="LR", show_schemas=True, schema_fillcolor="#FFD")
     printer.save_as_mermaid(scheduler.agents, 'r:/pipeline_condition_large.mmd')
-    printer = PipelinePrinter(direction="LR", show_schemas=False, schema_fillcolor="#FFD")
-    printer.save_as_mermaid(scheduler.agents, 'r:/pipeline_condition.mmd')
 
     # Optional render to SVG/PNG (requires the Mermaid CLI):
     #   $ mmdc -i pipeline.mmd -o pipeline.svg
@@ -102,7 +99,6 @@ def main():
     start_time = time.perf_counter()
     goon = scheduler.step()
     scheduler.save_scheduler(SAVE_DIR)
-    scheduler.save_scheduler(SAVE_DIR)
     end_time = time.perf_counter()
     execution_time = end_time - start_time
     print(f"Execution time: {execution_time:.2f} seconds")
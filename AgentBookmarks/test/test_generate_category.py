@@ -0,0 +1,79 @@
+# tests/test_generate_category.py
+import asyncio
+import unittest
+
+from AgentBookmarks.BookmarkMultiPortAggregatorAgent import BookmarkMultiPortAggregatorOutput
+from AgentBookmarks.FirefoxBookmarkAgent import Bookmark
+from AgentBookmarks.GenerateCategoryForBookmarkAgent import GenerateCategoryForBookmarkAgent, \
+    GenerateCategoryForBookmarkOutput
+from AgentBookmarks.WebpageToCategoryAgent import BookmarkOutput
+from AgentFramework.core.AgentScheduler import AgentScheduler
+from AtomicTools.webpage_scraper.tool.webpage_schema import WebpageScraperToolOutputSchema, WebpageMetadata
+from util.LLMSupport import LLMAgentConfig, Provider
+
+
+class FakeAsyncModel:
+    """
+    Replaces the async LLM call: answers with the folder of the bookmark in
+    the prompt, later bookmarks first, and records the calls running at once.
+    """
+
+    def __init__(self, fail_for: str = None):
+        self.fail_for = fail_for
+        self.running = 0
+        self.max_running = 0
+
+    async def ahl_pydantic_completions(self, sys_prompt, user_prompt, targetType, title):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        folder = user_prompt.split("Originaler Lesezeichen Ordner: kinder/")[1].splitlines()[0]
+        await asyncio.sleep(0.001 * (10 - int(folder[-1])))
+        self.running -= 1
+        if folder == self.fail_for:
+            raise RuntimeError("LLM down")
+        return targetType(hauptkategorie="LLM", unterkategorie=folder), None
+
+    async def aclose(self):
+        pass
+
+
+def bookmark(i: int) -> BookmarkMultiPortAggregatorOutput:
+    return BookmarkMultiPortAggregatorOutput(
+        webpage=WebpageScraperToolOutputSchema(content="",
+                                               metadata=WebpageMetadata(title=f"Seite {i}", domain="example.org"),
+                                               error="404"),
+        llm=BookmarkOutput.empty(),
+        bookmark=Bookmark(title=f"Lesezeichen {i}", url=f"https://example.org/{i}", folder=f"kinder/ordner{i}"))
+
+
+class TestGenerateCategory(unittest.TestCase):
+
+    def setUp(self):
+        config = LLMAgentConfig(model="gpt-4o-mini", provider=Provider.OPENAI, api_key="test-key")
+        self.agent = GenerateCategoryForBookmarkAgent(config, uuid="categories")
+
+    def run_async(self, model: FakeAsyncModel, max_batch: int):
+        self.agent.model = model
+        scheduler = AgentScheduler(uuid="categories")
+        scheduler.add_agent(self.agent)
+        for i in range(8):
+            self.agent.feed(bookmark(i))
+        scheduler.step_all_async(max_batch=max_batch)
+        return self.agent.get_final_outputs()
+
+    def test_step_all_async_runs_llm_calls_concurrently(self):
+        model = FakeAsyncModel()
+        outputs = self.run_async(model, max_batch=4)
+
+        self.assertEqual(model.max_running, 4)
+        self.assertEqual([msg.unterkategorie for msg in outputs], [f"ordner{i}" for i in range(8)])
+
+    def test_failed_llm_call_uses_original_folder(self):
+        outputs = self.run_async(FakeAsyncModel(fail_for="ordner3"), max_batch=8)
+
+        self.assertEqual(outputs[3], GenerateCategoryForBookmarkOutput(hauptkategorie="Kinder", unterkategorie="Ordner3"))
+        self.assertEqual(outputs[4].hauptkategorie, "LLM")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+# tests/test_web_scraper.py
+import asyncio
+import unittest
+
+from AgentBookmarks.WebScraperAgent import HttpWebScraperAgent
+from AgentFramework.core.AgentScheduler import AgentScheduler
+from AtomicTools.webpage_scraper.tool.webpage_scraper import WebpageScraperToolConfig, WebpageScraperToolInputSchema
+
+
+class FakeHttpWebScraperAgent(HttpWebScraperAgent):
+    """
+    Serves the pages from memory instead of the network, later pages first,
+    and records the requests running at once.
+    """
+
+    def __init__(self, max_concurrent: int):
+        super().__init__(WebpageScraperToolConfig(), max_concurrent=max_concurrent)
+        self.running = 0
+        self.max_running = 0
+
+    async def _afetch_webpage(self, session, url: str) -> str:
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        i = int(url.rsplit("/", 1)[1])
+        await asyncio.sleep(0.001 * (10 - i))
+        self.running -= 1
+        if i == 3:
+            raise RuntimeError("404")
+        return f"<html><head><title>Seite {i}</title></head><body><main><p>Inhalt {i}</p></main></body></html>"
+
+
+class TestHttpWebScraper(unittest.TestCase):
+
+    def test_step_all_pipelined_fetches_concurrently(self):
+        agent = FakeHttpWebScraperAgent(max_concurrent=3)
+        scheduler = AgentScheduler(uuid="scraper")
+        scheduler.add_agent(agent)
+        for i in range(8):
+            agent.feed(WebpageScraperToolInputSchema(url=f"https://example.org/{i}"))
+        agent.feed(WebpageScraperToolInputSchema(url=None))
+        scheduler.step_all_pipelined(max_in_flight=8)
+        results = agent.get_final_outputs()
+
+        self.assertEqual(agent.max_running, 3)
+        self.assertEqual(len(results), 9)
+        self.assertIn("Inhalt 0", results[0].content)
+        self.assertIn("Inhalt 7", results[7].content)
+        self.assertEqual(results[3].error, "404")
+        self.assertIsNotNone(results[8].error)
+        # The session of the finished loop is closed
+        self.assertIsNone(agent._session)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+# tests/test_webpage_batch.py
+import json
+import unittest
+from types import SimpleNamespace
+
+from AgentBookmarks.WebpageToCategoryAgent import WebpageToCategoryAgent, WebpageToCategoryInput, BookmarkOutput
+from AgentFramework.core.AgentScheduler import AgentScheduler
+from AtomicTools.webpage_scraper.tool.webpage_schema import WebpageMetadata
+from util.LLMSupport import LLMAgentConfig, LLMModel, Provider
+
+
+class FakeBatchClient:
+    """
+    Stands in for the `files` and `batches` parts of the OpenAI client. Every
+    request gets the reply 'page <n>' (n = line of the upload), except the
+    `broken` lines, and the output file lists the replies in reverse order.
+    """
+
+    def __init__(self, broken=(), initial_status="completed"):
+        self.uploads = []
+        self.broken = set(broken)
+        self.initial_status = initial_status
+        self.retrieved = 0
+        self.files = SimpleNamespace(create=self._create_file, content=self._content)
+        self.batches = SimpleNamespace(create=self._create_batch, retrieve=self._retrieve)
+
+    def _create_file(self, file, purpose):
+        name, data = file
+        self.uploads.append([json.loads(line) for line in data.decode("utf-8").splitlines()])
+        return SimpleNamespace(id=f"file-{len(self.uploads)}")
+
+    def _create_batch(self, input_file_id, endpoint, completion_window):
+        return SimpleNamespace(id="batch-1", status=self.initial_status, output_file_id="out-1")
+
+    def _retrieve(self, batch_id):
+        self.retrieved += 1
+        return SimpleNamespace(id=batch_id, status="completed", output_file_id="out-1")
+
+    def _content(self, file_id):
+        lines = []
+        for i, request in reversed(list(enumerate(self.uploads[-1]))):
+            content = "no json" if i in self.broken else json.dumps({
+                "titel": f"page {i}", "kategorie": "Test", "unterkategorie": "Batch",
+                "schlagwoerter": ["a"], "beschreibung": "Beschreibung", "ist_gueltig": True,
+            })
+            lines.append(json.dumps({"custom_id": request["custom_id"],
+                                     "response": {"body": {"choices": [{"message": {"content": content}}]}}}))
+        return SimpleNamespace(text="\n".join(lines))
+
+
+def batch_config() -> LLMAgentConfig:
+    return LLMAgentConfig(model="gpt-4o-mini", provider=Provider.OPENAI, api_key="test-key", use_batch_api=True)
+
+
+def page(i: int, error: str = None) -> WebpageToCategoryInput:
+    return WebpageToCategoryInput(url=f"https://example.org/{i}",
+                                  content=f"Inhalt der Seite {i}",
+                                  metadata=WebpageMetadata(title=f"Seite {i}", domain="example.org"),
+                                  webpage_error=error)
+
+
+class TestWebpageBatch(unittest.TestCase):
+
+    def test_batch_completions_in_prompt_order(self):
+        model = LLMModel(batch_config(), "TestWebpageBatch")
+        model.client = FakeBatchClient(broken={1}, initial_status="in_progress")
+        replies = model.batch_pydantic_completions([("sys", "a"), ("sys", "b"), ("sys", "c")],
+                                                   targetType=BookmarkOutput,
+                                                   poll_interval=0)
+
+        self.assertEqual(model.client.retrieved, 1)
+        self.assertEqual(len(model.client.uploads[0]), 3)
+        self.assertEqual(replies[0].titel, "page 0")
+        self.assertIsNone(replies[1])
+        self.assertEqual(replies[2].titel, "page 2")
+
+    def test_submit_batch_skips_unreadable_pages(self):
+        agent = WebpageToCategoryAgent(batch_config(), uuid="batch")
+        agent.model.client = FakeBatchClient(broken={1})
+        results = agent.submit_batch([page(0), page(1, error="404"), page(2), page(3)])
+
+        # The unreadable page is not sent, the broken reply falls back to an empty result
+        self.assertEqual(len(agent.model.client.uploads[0]), 3)
+        self.assertEqual([result.titel for result in results], ["page 0", "", "Seite 2", "page 2"])
+        self.assertFalse(results[1].ist_gueltig)
+
+    def test_step_all_async_uses_batch_api(self):
+        agent = WebpageToCategoryAgent(batch_config(), uuid="batch")
+        agent.model.client = FakeBatchClient()
+        scheduler = AgentScheduler(uuid="batch")
+        scheduler.add_agent(agent)
+        for i in range(5):
+            agent.feed(page(i))
+        scheduler.step_all_async(max_batch=8)
+
+        self.assertEqual(len(agent.model.client.uploads), 1)
+        self.assertEqual([msg.titel for msg in agent.get_final_outputs()], [f"page {i}" for i in range(5)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,13 @@
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
+import importlib.metadata
 import os
 import re
-from typing import Type, List, Optional
-import io
-import contextlib
+import subprocess
+import sys
+from collections import deque
+from itertools import islice
+from typing import Type, List, Optional, Tuple, Deque
 
 from atomic_agents.lib.base.base_io_schema import BaseIOSchema
 from openai.types import CompletionUsage
@@ -14,53 +19,75 @@ from agent_logging import logger
 from util.ChatSupport import ChatSupport, CallStep, Prompt
 from util.LLMSupport import LLMAgentConfig, LLMModel, ChatMessage, LLMReply, LLMRequest
 
-import subprocess
+_REQ_NAME_RE = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+
+# Started as 'python -c' with memory bytes, CPU seconds and file name:
+# applies the limits (POSIX only) and runs the code read from stdin.
+_EXEC_BOOTSTRAP = """
+import sys
+try:
+    import resource
+except ImportError:
+    resource = None
+memory_limit, cpu_limit, filename = int(sys.argv[1]), int(sys.argv[2]), sys.argv[3]
+if resource is not None and memory_limit:
+    resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+if resource is not None and cpu_limit:
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit))
+del sys.argv[1:]
+code = compile(sys.stdin.read(), filename, "exec")
+del resource, memory_limit, cpu_limit, filename
+exec(code, {"__name__": "__main__", "__builtins__": __builtins__})
+"""
+# Characters of stdout/stderr sent back to the LLM after a failed attempt
+_MAX_FEEDBACK_CHARS = 4096
+# Environment variables hidden from the generated code
+_SECRET_ENV_PARTS = ("KEY", "TOKEN", "SECRET", "PASSWORD")
+# Code wrapped in triple-backtick fences, with an optional language tag
+_FENCE_RE = re.compile(r"^\s*```(?:\w+)?\n([\s\S]*?)\n```\s*$")
 
-_cached_pkgs = None
 
-def get_top_level_packages(limit=None):
-    global _cached_pkgs
-    if _cached_pkgs is None:
-        try:
-            result = subprocess.run(
-                ["pip", "list", "--not-required", "--format=freeze"],
-                stdout=subprocess.PIPE,
-                text=True
-            )
-        except subprocess.CalledProcessError as e:
-            logger.warning("Failed to get pip package list: %s", str(e))
-            return []
-        packages = result.stdout.strip().split("\n")
-        clean_pkgs = [pkg.split("==")[0] for pkg in packages if pkg]
-        if limit is not None:
-            _cached_pkgs = clean_pkgs[:limit]
-        else:
-            _cached_pkgs = clean_pkgs
-    return _cached_pkgs
+def _canonical_name(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
 
 
-def sysprompt(path, use_packages):
-    if path:
-        pathdata =f"- Output files can be written to: '{path}' No other path must be written to."
-    else:
-        pathdata = "- You are not allowed to write any files."
+@functools.lru_cache(maxsize=None)
+def _top_level_packages(limit: Optional[int]) -> Tuple[str, ...]:
+    """
+    Installed distributions no other installed distribution depends on,
+    like `pip list --not-required`, but read in-process from the metadata.
+    """
+    names = {}
+    required = set()
+    for dist in importlib.metadata.distributions():
+        name = dist.metadata["Name"]
+        if not name:
+            continue
+        names.setdefault(_canonical_name(name), name)
+        for req in dist.requires or []:
+            # Dependencies of optional extras do not count, as with pip
+            if ";" in req and "extra" in req.split(";", 1)[1]:
+                continue
+            match = _REQ_NAME_RE.match(req)
+            if match:
+                required.add(_canonical_name(match.group(1)))
+    pkgs = sorted((name for key, name in names.items() if key not in required), key=str.lower)
+    return tuple(pkgs[:limit] if limit is not None else pkgs)
+
 
-    available_packages = get_top_level_packages(30)
-    if available_packages:
-        pkgs = ', '.join(available_packages)
-        packagedata = f"- The following Python packages are explicitly installed too: {pkgs}\n"
-        packagedata = f"""
+def get_top_level_packages(limit=None):
+    return list(_top_level_packages(limit))
+
+
+_PKG_BLOCK_TEMPLATE = """
 ## Packages
 Standard packaes are installed like 
 - pandas, requests, ...
-{packagedata}
+- The following Python packages are explicitly installed too: {pkgs}
+
             """
-    else:
-        packagedata = ""
-    if not use_packages:
-        packagedata = ""
 
-    system_promt = f"""
+_SYS_PROMPT_TEMPLATE = """
 You are a Python code-writing assistant.
 
 Your job is to help solve problems by:
@@ -98,12 +125,12 @@ Your job is to help solve problems by:
 3. Code is executed and results are returned
 4. Agent interprets the results and refines the code if needed 
 
-{packagedata}
+{package_block}
 
 ## Program output
 - STDOUT and STDERR of the program are fed back to the user. 
 - So all important program output must go to STDOUT possible errors to STDERR.
-{pathdata}
+{path_line}
 
 
 ## Output Format
@@ -112,13 +139,56 @@ Your job is to help solve problems by:
 - Provide a concise explanations only inside python comments
 - The code will and must directly run
 """
-    return system_promt
+
+
+@functools.lru_cache(maxsize=None)
+def sysprompt(path, use_packages):
+    """
+    The system prompt; built once per (path, use_packages) combination.
+    """
+    if path:
+        path_line =f"- Output files can be written to: '{path}' No other path must be written to."
+    else:
+        path_line = "- You are not allowed to write any files."
+
+    package_block = ""
+    if use_packages:
+        available_packages = get_top_level_packages(30)
+        if available_packages:
+            package_block = _PKG_BLOCK_TEMPLATE.format(pkgs=', '.join(available_packages))
+
+    return _SYS_PROMPT_TEMPLATE.format(package_block=package_block, path_line=path_line)
+
+def _clean_env() -> dict:
+    """The environment for generated code, without API keys and other secrets."""
+    return {name: value for name, value in os.environ.items()
+            if not any(secret in name.upper() for secret in _SECRET_ENV_PARTS)}
+
+
+def _tail(text: str, limit: int = _MAX_FEEDBACK_CHARS) -> str:
+    """The last `limit` characters of a program output."""
+    if len(text) <= limit:
+        return text
+    return f"[... {len(text) - limit} characters cut ...]\n{text[-limit:]}"
+
+
+def _as_text(output) -> str:
+    # TimeoutExpired may carry bytes even in text mode
+    if output is None:
+        return ""
+    if isinstance(output, bytes):
+        return output.decode("utf-8", errors="replace")
+    return output
+
 
 class LLMCodeAgentConfig(LLMAgentConfig):
     """
     Configuration class for LLMAgent, defining model parameters and API key.
     """
     code_dir: Optional[str] = Field(None, description="code dir")
+    exec_timeout: Optional[int] = Field(300, description="Wall clock and CPU seconds the generated code may run")
+    exec_memory_mb: Optional[int] = Field(None, description="Address space limit of the code process in MB (POSIX only)")
+    history_window: Optional[int] = Field(20, description="Number of most recent messages kept and sent as history")
 
 class CodeMessage(BaseModel):
     """
@@ -162,12 +232,85 @@ class CodeLLMAgent(ConnectedAgent):
 
     def __init__(self, config: LLMCodeAgentConfig) -> None:
         super().__init__(config)
-        self._state = CodeAgentState(memory=AgentMemory())
+        self._state = CodeAgentState(memory=AgentMemory(max_messages=config.history_window))
+        # Formatted history lines, see _history_lines
+        self._formatted_lines: Optional[Deque[str]] = None
         self.model = LLMModel(config, self.__class__.__name__)
         self.model.delete_log_files()
+        # Output files of every attempt, paths built once
+        self._code_file: Optional[str] = None
+        self._prompt_file: Optional[str] = None
         if config.code_dir:
             os.makedirs(config.code_dir, exist_ok=True)
+            self._code_file = os.path.join(config.code_dir, "generated_code.py")
+            self._prompt_file = os.path.join(config.code_dir, "prompt.txt")
         self._chat = ChatSupport({CallStep.DEFAULT: self.model})
+        # Writes the code and prompt files while the code runs. One worker
+        # keeps the writes in order, later attempts overwrite the same files.
+        # Stopped by close(), later writes are synchronous.
+        self._writer: Optional[ThreadPoolExecutor] = None
+        if self._code_file:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="CodeLLMAgent")
+
+    @staticmethod
+    def _write_files(files: Tuple[Tuple[str, str], ...]) -> None:
+        # All files of an attempt in one job of the writer thread
+        for file_path, content in files:
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write(content)
+
+    def _execute(self, code_text: str, code_filename: str) -> Tuple[str, str, Optional[str]]:
+        """
+        Runs the code in a separate, isolated Python process, so it cannot
+        block or pollute the agent process, with the configured limits.
+
+        Returns:
+            Tuple[str, str, Optional[str]]: stdout, stderr and the error or None on success.
+        """
+        try:
+            # Syntax errors need no process
+            compile(code_text, code_filename, "exec")
+        except SyntaxError as e:
+            error = f"SyntaxError: {e}"
+            return "", error, error
+        timeout = self.config.exec_timeout
+        memory_limit = self.config.exec_memory_mb * 1024 * 1024 if self.config.exec_memory_mb else 0
+        try:
+            # The code comes via stdin; -X utf8 because -I ignores PYTHONIOENCODING.
+            # The limits are set by the child itself (_EXEC_BOOTSTRAP), no preexec_fn
+            # in the fork of this multithreaded process.
+            result = subprocess.run([sys.executable, "-I", "-B", "-X", "utf8", "-c", _EXEC_BOOTSTRAP,
+                                     str(memory_limit), str(timeout or 0), code_filename],
+                                    input=code_text,
+                                    timeout=timeout,
+                                    capture_output=True,
+                                    text=True,
+                                    encoding="utf-8",
+                                    errors="replace",
+                                    env=_clean_env())
+        except subprocess.TimeoutExpired as e:
+            error = f"Execution timed out after {timeout} seconds"
+            return _as_text(e.stdout), _as_text(e.stderr) + error, error
+        if result.returncode != 0:
+            # The exception message is the last line of the traceback
+            lines = result.stderr.strip().splitlines()
+            error = lines[-1] if lines else f"Process exited with code {result.returncode}"
+            return result.stdout, result.stderr, error
+        return result.stdout, result.stderr, None
+
+    @staticmethod
+    def _wait_writes(writes: List[Future]) -> None:
+        # Raises the first write error, like the former synchronous writes
+        for write in writes:
+            write.result()
+
+    def close(self) -> None:
+        """
+        Wait for pending file writes and stop the writer thread.
+        """
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+            self._writer = None
 
     def getHistory(self, n: Optional[int] = None) -> List[dict]:
         """
@@ -181,10 +324,38 @@ class CodeLLMAgent(ConnectedAgent):
         return self._state.memory.get_history(n)
 
     def getFormattedHistory(self, n: Optional[int] = None):
-        history = self.getHistory(n)
-        if not history:
+        lines = self._history_lines()
+        if not lines:
             return None
-        return '\n'.join(f"{msg['role']}: {msg['content']}" for msg in history)
+        if n is not None and n > 0:
+            return '\n'.join(islice(lines, max(0, len(lines) - n), None))
+        return '\n'.join(lines)
+
+    def _history_lines(self) -> Optional[Deque[str]]:
+        """
+        The formatted history lines, one per message. They are appended by
+        `_remember` and only rebuilt from the memory after a state restore.
+        """
+        if not self._state or not self._state.memory:
+            return None
+        if self._formatted_lines is None:
+            memory = self._state.memory
+            self._formatted_lines = deque((f"{msg['role']}: {msg['content']}" for msg in memory.get_history()),
+                                          maxlen=memory.max_messages)
+        return self._formatted_lines
+
+    def _remember(self, role: str, content: BaseModel) -> None:
+        """Adds a message to the memory and its formatted line to the history cache."""
+        self._state.memory.add_message(role=role, content=content)
+        if self._formatted_lines is None:
+            return  # Built including this message on the next use
+        msg = self._state.memory.get_history(1)[0]
+        self._formatted_lines.append(f"{msg['role']}: {msg['content']}")
+
+    def load_state(self, state_dict: dict):
+        super().load_state(state_dict)
+        # Rebuilt from the restored memory on the next use
+        self._formatted_lines = None
 
     def run(self, user_input: LLMRequest) -> LLMReply:
         """
@@ -196,12 +367,15 @@ class CodeLLMAgent(ConnectedAgent):
         Returns:
             LLMReply: Contains the final code, captured stdout/stderr or an error after up to 3 attempts.
         """
-        history: List[dict] = self._state.memory.get_history() if self.config.use_memory else None
+        history: List[dict] = self._state.memory.get_history(self.config.history_window) if self.config.use_memory else None
         last_error: Optional[str] = None
         final_code: Optional[str] = None
         usage: Optional[CompletionUsage] = None
         stdout_capture: str = ""
         stderr_capture: str = ""
+        writes: List[Future] = []
+        # Syntax errors name the written file if there is one
+        code_filename = self._code_file or "<generated_code>"
 
         # Loop up to 3 attempts to refine code
         for attempt in range(1, 4):
@@ -209,17 +383,18 @@ class CodeLLMAgent(ConnectedAgent):
                 prompt_text = f"YOUR TASK: {user_input.user}"
                 use_packages = False
             else:
-                prompt_text = (
-                        f"Previous code:\n# -------- \n{final_code}\n# --------"
-                        f"Previous stdout:\n{stdout_capture}\n# --------"
-                        f"Previous stderr:\n{stderr_capture}\n# --------"
-                        f"The previous execution resulted in an error:\n{last_error}\n# --------"
-                        f"Analyse the error carefully. Put a step by step analsis at the beginning of the new file "
-                        f"in python comments, like"
-                        f"# The previous code failed because I did not open a file"
-                        f"User TASK:{user_input.user}\n# --------"
-                        f"Now Please fix the previous code accordingly to fulfill the original request:"
-                )
+                # Only the end of long program output goes back to the LLM
+                prompt_text = "\n".join([
+                        f"Previous code:\n# -------- \n{final_code}\n# --------",
+                        f"Previous stdout:\n{_tail(stdout_capture)}\n# --------",
+                        f"Previous stderr:\n{_tail(stderr_capture)}\n# --------",
+                        f"The previous execution resulted in an error:\n{last_error}\n# --------",
+                        "Analyse the error carefully. Put a step by step analsis at the beginning of the new file "
+                        "in python comments, like",
+                        "# The previous code failed because I did not open a file",
+                        f"User TASK:{user_input.user}\n# --------",
+                        "Now Please fix the previous code accordingly to fulfill the original request:",
+                ])
                 use_packages = True
 
             sys_p = sysprompt(self.config.code_dir, use_packages)
@@ -235,44 +410,34 @@ class CodeLLMAgent(ConnectedAgent):
             logger.info(f"CodeLLMAgent: Generating code (attempt {attempt})... code dir {self.config.code_dir}")
             code_text, usage = self._chat.generate_chat(prompt, history)
             # Strip triple-backtick fences if present
-            fence_match = re.match(r"^\s*```(?:\w+)?\n([\s\S]*?)\n```\s*$", code_text)
-            if fence_match:
-                code_text = fence_match.group(1)
+            if code_text.lstrip().startswith("```"):
+                fence_match = _FENCE_RE.match(code_text)
+                if fence_match:
+                    code_text = fence_match.group(1)
             final_code = code_text
             logger.info(f"CodeLLMAgent: Generated code\n# -------\n{final_code}\n# ------")
 
-            if self.config.code_dir:
-                file_path = os.path.join(self.config.code_dir, "generated_code.py")
-                with open(file_path, "w", encoding="utf-8") as f:
-                    f.write(final_code)
-                file_path = os.path.join(self.config.code_dir, "prompt.txt")
-                with open(file_path, "w", encoding="utf-8") as f:
-                    f.write(f"{sys_p}\n\n{prompt_text}")
-                logger.info(f"CodeLLMAgent: Code written to {file_path}")
-
-            # Capture stdout and stderr during execution
-            stdout_buf = io.StringIO()
-            stderr_buf = io.StringIO()
-            execution_env = {}
-            try:
-                with contextlib.redirect_stdout(stdout_buf), contextlib.redirect_stderr(stderr_buf):
-                    exec(code_text, execution_env, execution_env)
-                stdout_capture = stdout_buf.getvalue()
-                stderr_capture = stderr_buf.getvalue()
+            if self._code_file:
+                files = ((self._code_file, final_code), (self._prompt_file, f"{sys_p}\n\n{prompt_text}"))
+                if self._writer is not None:
+                    writes.append(self._writer.submit(self._write_files, files))
+                else:
+                    self._write_files(files)
+                logger.info(f"CodeLLMAgent: Code written to {self._prompt_file}")
+
+            stdout_capture, stderr_capture, last_error = self._execute(code_text, code_filename)
+            if last_error is None:
                 logger.info("Code executed successfully.")
                 logger.info(f"CodeLLMAgent: stdout_capture {stdout_capture}")
                 logger.info(f"CodeLLMAgent: stderr_capture {stderr_capture}")
-                last_error = None
                 break
-            except Exception as e:
-                stdout_capture = stdout_buf.getvalue()
-                stderr_capture = stderr_buf.getvalue() + str(e)
-                last_error = str(e)
+            else:
                 logger.warning(f"Execution error on attempt {attempt}: {last_error}")
                 logger.warning(f"CodeLLMAgent: stdout_capture {stdout_capture}")
                 logger.warning(f"CodeLLMAgent: stderr_capture {stderr_capture}")
                 if attempt == 3:
                     logger.error("Max attempts reached. Returning error and logs.")
+                    self._wait_writes(writes)
                     return LLMReply(
                         usage=usage,
                         reply=CodeMessage(text=f"Error after 3 attempts: {last_error}", stdout=stdout_capture, stderr=stderr_capture),
@@ -282,12 +447,13 @@ class CodeLLMAgent(ConnectedAgent):
 
         # Store conversation in memory if enabled
         if self.config.use_memory:
-            self._state.memory.add_message(role="user", content=ChatMessage(text=user_input.user))
-            self._state.memory.add_message(role="assistant", content=CodeMessage(text=final_code or "", stdout=stdout_capture, stderr=stderr_capture))
+            self._remember("user", ChatMessage(text=user_input.user))
+            self._remember("assistant", CodeMessage(text=final_code or "", stdout=stdout_capture, stderr=stderr_capture))
 
 
 
         # Return the final code snippet with captured outputs
+        self._wait_writes(writes)
         return LLMReply(
             usage=usage,
             reply=CodeMessage(text=final_code, stdout=stdout_capture, stderr=stderr_capture),
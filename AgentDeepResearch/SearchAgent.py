@@ -23,7 +23,8 @@ class SearchAgent(ConnectedAgent, TavilySearchTool):
         if DUMMY_WEB:
             dummy_results: List[TavilySearchResultItemSchema] = []
 
-            for i in range(5):  # change 5 to however many you want
+            # Same number of results per query as the real search
+            for i in range(5 * len(params.queries)):  # change 5 to however many you want
                 dummy_result = TavilySearchResultItemSchema(
                     title=f"Dummy Search Result Title {i}",
                     url=f"https://example.com/dummy-result-{i}",
@@ -1,9 +1,11 @@
+import asyncio
+import concurrent.futures
+import threading
 import time
 import datetime
-from typing import Dict, Optional, List, Set, Iterable
+from typing import Dict, Optional, List, Set, Iterable, Tuple
 from pydantic import BaseModel, Field
 import os
-import json
 
 from AgentFramework.core import ConnectedAgent
 from AgentFramework.core.InfiniteSchema import InfiniteSchema
@@ -11,6 +13,7 @@ from AgentFramework.core.MultiPortAgent import MultiPortAgent
 from AgentFramework.core.Schedulable import Schedulable
 from AgentFramework.core.ToolPort import ToolPort
 from agent_logging import rich_console
+from util import fast_json
 from util.SchedulerException import SchedulerException
 
 class AgentSchedulerState(BaseModel):
@@ -59,6 +62,8 @@ class AgentScheduler(Schedulable):
                  uuid:str = 'Scheduler') -> None:
         """Initializes an empty agent scheduler."""
         self.agents = []
+        # (async agents, sync agents, agent index by id) once frozen
+        self._frozen: Optional[Tuple[Tuple, Tuple, Dict[int, int]]] = None
         self.save_dir = save_dir
         self.error_dir = error_dir
         self.save_step = save_step
@@ -79,11 +84,21 @@ class AgentScheduler(Schedulable):
     def global_state(self) -> BaseModel:
         return self._global_state
 
+    def flush(self) -> None:
+        """
+        Flush the buffered output of all agents, so a checkpoint never counts
+        messages as done whose output is still in memory.
+        """
+        for agent in self.agents:
+            agent.flush()
+
     def close(self):
         """
-        Close debugger etc
+        Close the agents, debugger etc
         :return:
         """
+        for agent in self.agents:
+            agent.close()
         if self.debugger:
             self.debugger.exit_debugger()
 
@@ -100,6 +115,24 @@ class AgentScheduler(Schedulable):
             if self._global_state is not None:
                 agent.global_state = self._global_state
             self.agents.append(agent)
+            self._frozen = None
+
+    def freeze(self) -> None:
+        """
+        Precomputes the agent groups of `step_all_async` / `step_all_pipelined`
+        once all agents are added: which agents run async and the index of
+        every agent. Adding another agent drops the precomputed data.
+        """
+        self._frozen = (
+            tuple(agent for agent in self.agents if hasattr(agent, "arun")),
+            tuple(agent for agent in self.agents if not hasattr(agent, "arun")),
+            {id(agent): idx for idx, agent in enumerate(self.agents)},
+        )
+
+    def _agent_groups(self) -> Tuple[Tuple, Tuple, Dict[int, int]]:
+        if self._frozen is None:
+            self.freeze()
+        return self._frozen
 
 
     def queque_sizes(self):
@@ -266,6 +299,143 @@ class AgentScheduler(Schedulable):
 
         return self.state.step_counter
 
+    def step_all_async(self, clear_previous_outputs:bool = False, max_batch:int = 16) -> int:
+        """
+        Like `step_all`, but agents with an async `arun` (the LLM agents) are
+        co-scheduled: each round first runs all of them concurrently, each on
+        up to `max_batch` queued messages, and then steps every other agent once.
+        Stops when a whole round was idle. Returns the final `step_counter`.
+        :param clear_previous_outputs: Calls clear final outputs before running
+        :param max_batch: Messages an async agent processes concurrently per round
+        """
+        return asyncio.run(self._run_and_aclose(self._astep_all(clear_previous_outputs, max_batch)))
+
+    async def _run_and_aclose(self, coro):
+        try:
+            return await coro
+        finally:
+            await self._aclose_agents()
+
+    async def _aclose_agents(self) -> None:
+        # Async clients (e.g. AsyncOpenAI) belong to the loop that is ending
+        all_async = self._agent_groups()[0]
+        await asyncio.gather(*(agent.aclose() for agent in all_async if hasattr(agent, "aclose")))
+
+    async def _astep_all(self, clear_previous_outputs:bool, max_batch:int) -> int:
+        rich_console.print(
+            f"[red]Start async scheduler at step {self.state.step_counter} "
+            f"agents={len(self.agents)}[/red]"
+        )
+        if clear_previous_outputs:
+            self.clear_final_outputs()
+        self.clear_log()
+
+        all_async, all_sync, agent_index = self._agent_groups()
+        round_idx = 0
+        while True:
+            async_agents = [agent for agent in all_async if agent.is_active]
+            sync_agents = [agent for agent in all_sync if agent.is_active]
+            try:
+                did_run = any(await asyncio.gather(*(agent.astep(max_batch) for agent in async_agents)))
+                self.state.step_counter += len(async_agents)
+                for agent in sync_agents:
+                    self.state.step_counter += 1
+                    if agent.step():
+                        did_run = True
+                        self.log_run_agent(type(agent), agent.uuid, self.state.step_counter,
+                                           agent_index[id(agent)], agent.run_log_string())
+            except SchedulerException as e:
+                rich_console.print(
+                    f"[red][ERROR] {e.agent_name} failed in step "
+                    f"{self.state.step_counter} with: {e.original_exception}[/red]"
+                )
+                if self.error_dir:
+                    self.save_scheduler(self.error_dir)
+                raise
+            if not did_run:
+                rich_console.print(f"[red]No active agent found scheduler {self.uuid} round {round_idx}[/red]")
+                return self.state.step_counter
+            if self.save_dir and round_idx % self.save_step == 0:
+                self.save_scheduler(f"{self.save_dir}/step_{round_idx}")
+            round_idx += 1
+
+    def step_all_pipelined(self, clear_previous_outputs:bool = False, max_in_flight:int = 32) -> int:
+        """
+        Like `step_all_async`, but the async agents do not wait for each other
+        or for the round: their `arun` calls run on an event loop in a worker
+        thread while the scheduler keeps stepping the other agents (e.g. the
+        web scraper). Each async agent keeps at most `max_in_flight` messages
+        running and sends the outputs in input order. All port traffic stays on
+        the calling thread. Before a checkpoint the running messages are
+        finished, so a snapshot never misses a message.
+        Returns the final `step_counter`.
+        :param clear_previous_outputs: Calls clear final outputs before running
+        :param max_in_flight: Unfinished messages allowed per async agent
+        """
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, name="pipeline-loop", daemon=True)
+        thread.start()
+        try:
+            return self._pipeline_all(loop, clear_previous_outputs, max_in_flight)
+        finally:
+            asyncio.run_coroutine_threadsafe(self._aclose_agents(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    def _pipeline_all(self, loop:asyncio.AbstractEventLoop, clear_previous_outputs:bool, max_in_flight:int) -> int:
+        rich_console.print(
+            f"[red]Start pipelined scheduler at step {self.state.step_counter} "
+            f"agents={len(self.agents)}[/red]"
+        )
+        if clear_previous_outputs:
+            self.clear_final_outputs()
+        self.clear_log()
+
+        all_async, all_sync, agent_index = self._agent_groups()
+        round_idx = 0
+        while True:
+            async_agents = [agent for agent in all_async if agent.is_active]
+            sync_agents = [agent for agent in all_sync if agent.is_active]
+            try:
+                did_run = False
+                for agent in async_agents:
+                    self.state.step_counter += 1
+                    if agent.collect_async():
+                        did_run = True
+                    if agent.submit_async(loop, max_in_flight):
+                        did_run = True
+                for agent in sync_agents:
+                    self.state.step_counter += 1
+                    if agent.step():
+                        did_run = True
+                        self.log_run_agent(type(agent), agent.uuid, self.state.step_counter,
+                                           agent_index[id(agent)], agent.run_log_string())
+                pending = [future for agent in async_agents for future in agent.pending_async()]
+                if not did_run:
+                    if not pending:
+                        rich_console.print(f"[red]No active agent found scheduler {self.uuid} round {round_idx}[/red]")
+                        return self.state.step_counter
+                    # Only network calls left, sleep until one of them finishes
+                    concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    continue
+                if self.save_dir and round_idx % self.save_step == 0:
+                    concurrent.futures.wait(pending)
+                    for agent in async_agents:
+                        agent.collect_async()
+                    self.save_scheduler(f"{self.save_dir}/step_{round_idx}")
+            except SchedulerException as e:
+                rich_console.print(
+                    f"[red][ERROR] {e.agent_name} failed in step "
+                    f"{self.state.step_counter} with: {e.original_exception}[/red]"
+                )
+                for agent in all_async:
+                    agent.cancel_async()
+                if self.error_dir:
+                    self.save_scheduler(self.error_dir)
+                raise
+            round_idx += 1
+
     def get_final_outputs(self) -> Dict["ConnectedAgent", List[BaseModel]]:
         """
         Retrieves and clears final outputs from all agents that serve as sinks.
@@ -393,15 +563,21 @@ class AgentScheduler(Schedulable):
         `save_scheduler()` still work – they just look at a different file.
         """
         os.makedirs(path, exist_ok=True)
-        with open(os.path.join(path, "state.json"), "w") as f:
-            json.dump(self.save_state(), f, indent=2)
+        self.flush()
+        # One compact write to a temp file, then swap it in: a run killed
+        # during a checkpoint never leaves a truncated state.json behind.
+        state_path = os.path.join(path, "state.json")
+        tmp_path = state_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(fast_json.dumps(self.save_state()))
+        os.replace(tmp_path, state_path)
 
     def load_scheduler(self, path: str) -> None:
         """
         Restore the scheduler from `<path>/state.json`.
         """
-        with open(os.path.join(path, "state.json"), "r") as f:
-            snapshot = json.load(f)
+        with open(os.path.join(path, "state.json"), "rb") as f:
+            snapshot = fast_json.loads(f.read())
         self.load_state(snapshot)
 
 
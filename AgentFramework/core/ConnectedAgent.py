@@ -1,7 +1,10 @@
+import asyncio
+import concurrent.futures
 import inspect
 import time
 import traceback
-from typing import Type, List, Optional, Dict, Callable, Union, Tuple, Set, Any
+from collections import deque
+from typing import Type, List, Optional, Dict, Callable, Union, Tuple, Set, Any, Deque
 
 from atomic_agents.lib.base.base_io_schema import BaseIOSchema
 from atomic_agents.lib.base.base_tool import BaseTool, BaseToolConfig
@@ -65,6 +68,8 @@ class ConnectedAgent(BaseTool, Schedulable):
             raise TypeError("Each ConnectedAgent subclass must define `input_schema` and `output_schema`.")
         self.uuid = uuid
         self._config = config
+        # Pipelined mode: (queue item, future of arun) in input order
+        self._in_flight: Deque[Tuple[tuple, concurrent.futures.Future]] = deque()
 
         if create_ports:
             # ------------ INPUT -------------------------------------
@@ -286,6 +291,112 @@ class ConnectedAgent(BaseTool, Schedulable):
             pass
         return False
 
+    async def astep(self, max_batch: int = 1) -> bool:
+        """
+        Async version of `step` for agents that implement `async def arun(params)`.
+        Takes up to `max_batch` messages from the input queue and runs them
+        concurrently; the outputs are sent in input order.
+
+        Args:
+            max_batch (int): Maximum number of messages processed in this step.
+
+        Returns:
+            bool: True if processing occurred, False otherwise.
+        """
+        queue = self.input_port.queue
+        items = [queue.popleft() for _ in range(min(max_batch, len(queue)))]
+        if not items:
+            if self.debugger:
+                self.debugger.no_input(self)
+            return False
+        try:
+            if self.debugger:
+                for parents, timestamp, unique_id, input_msg in items:
+                    self.debugger.input(self, input_msg, parents)
+            output_msgs = await self.arun_batch([item[3] for item in items])
+        except Exception as e:
+            # Push the messages back to the front of the queue to preserve order
+            queue.extendleft(reversed(items))
+            raise SchedulerException(self.__class__.__name__, "Processing step failed", e)
+
+        for (parents, timestamp, unique_id, input_msg), output_msg in zip(items, output_msgs):
+            output_msg, ids = self.unwrap_id(output_msg, unique_id)
+            if self.debugger:
+                self.debugger.output(self, output_msg, parents)
+            self._send_output_msg(output_msg, parents, ids)
+        return True
+
+    async def arun_batch(self, batch: List[BaseIOSchema]) -> List[BaseIOSchema]:
+        """
+        Runs `arun` for the messages of one `astep` concurrently, the outputs in
+        input order. Agents can override it, e.g. to send them as one batch request.
+        """
+        return await asyncio.gather(*(self.arun(params) for params in batch))
+
+    def submit_async(self, loop: asyncio.AbstractEventLoop, max_in_flight: int) -> bool:
+        """
+        Pipelined version of `astep`: starts `arun` for queued messages on `loop`,
+        which runs in another thread, and returns without waiting for them.
+        Use `collect_async` to send the outputs.
+
+        Args:
+            loop (asyncio.AbstractEventLoop): Event loop running in a worker thread.
+            max_in_flight (int): Maximum number of unfinished messages of this agent.
+
+        Returns:
+            bool: True if a message was started, False otherwise.
+        """
+        queue = self.input_port.queue
+        started = False
+        while queue and len(self._in_flight) < max_in_flight:
+            item = queue.popleft()
+            if self.debugger:
+                self.debugger.input(self, item[3], item[0])
+            self._in_flight.append((item, asyncio.run_coroutine_threadsafe(self.arun(item[3]), loop)))
+            started = True
+        return started
+
+    def collect_async(self) -> bool:
+        """
+        Sends the outputs of finished `submit_async` messages. Outputs leave in
+        input order, so a slow message holds back the ones started after it.
+
+        Returns:
+            bool: True if an output was sent, False otherwise.
+        """
+        sent = False
+        while self._in_flight and self._in_flight[0][1].done():
+            item, future = self._in_flight.popleft()
+            parents, timestamp, unique_id, input_msg = item
+            try:
+                output_msg = future.result()
+            except Exception as e:
+                self._in_flight.appendleft((item, future))
+                self.cancel_async()
+                raise SchedulerException(self.__class__.__name__, "Processing step failed", e)
+            output_msg, ids = self.unwrap_id(output_msg, unique_id)
+            if self.debugger:
+                self.debugger.output(self, output_msg, parents)
+            self._send_output_msg(output_msg, parents, ids)
+            sent = True
+        return sent
+
+    def pending_async(self) -> List[concurrent.futures.Future]:
+        """
+        Futures of the messages started by `submit_async` and not yet collected.
+        """
+        return [future for item, future in self._in_flight]
+
+    def cancel_async(self) -> None:
+        """
+        Cancels the unfinished messages and puts them back to the front of the
+        input queue, in order.
+        """
+        for item, future in self._in_flight:
+            future.cancel()
+        self.input_port.queue.extendleft(reversed([item for item, future in self._in_flight]))
+        self._in_flight.clear()
+
     def _send_output_msg(self,
                          output_msg_var:Optional[Union[BaseModel, List[BaseModel], Tuple[BaseModel, ...]]],
                          parents:List[str],
@@ -373,6 +484,19 @@ class ConnectedAgent(BaseTool, Schedulable):
         return self.call_advanced_run(params, unique_id)
 
 
+    def flush(self) -> None:
+        """
+        Hand buffered output (e.g. of a file writer) to the operating system.
+        Called by AgentScheduler before a checkpoint.
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        Release files, threads etc. held by the agent. Called by AgentScheduler.close().
+        """
+        pass
+
     def save_state_to_file(self, path: str):
         import json
         with open(path, "w") as f:
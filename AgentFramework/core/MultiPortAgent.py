@@ -16,6 +16,10 @@ from AgentFramework.core.listutil import longest_common_sublist
 
 from util.SchedulerException import SchedulerException
 
+# Parent ids of chained messages look like UUID:idx1:idx2
+_PARENT_SUFFIX_PATTERN = re.compile(r"^(.*):(\d+):(\d+)$")
+
+
 class MultiPortPayload(BaseIOSchema):
     """
     Wrapper class for a dictionary of BaseIOSchema instances.
@@ -137,10 +141,9 @@ class MultiPortAgent(ConnectedAgent):
     @staticmethod
     def extract_parents_with_suffix(parents: List[str]) -> Dict[str, Tuple[str, str, str]]:
         """Extract UUID, idx1, idx2 for strings of form UUID:idx1:idx2 (idx2 > 1)."""
-        pattern = re.compile(r"^(.*):(\d+):(\d+)$")
         result: Dict[str, Tuple[str, str, str]] = {}
         for p in parents:
-            m = pattern.match(p)
+            m = _PARENT_SUFFIX_PATTERN.match(p)
             if m:
                 uuid, idx1, idx2 = m.groups()
                 if int(idx2) > 1:
@@ -156,7 +159,16 @@ class MultiPortAgent(ConnectedAgent):
         first_port_schema = self.input_schemas[0]
         first_port = self._input_ports[first_port_schema]
 
-
+        # The ":idx1:idx2" suffixes of every queued message do not depend on the
+        # anchor, so build them once per port instead of once per anchor.
+        port_suffixes: Dict[Type[BaseModel], List[frozenset]] = {
+            port_schema: [
+                frozenset(p[p.index(":"):] for p in parents if p.count(":") >= 2)
+                for (parents, timestamp, unique_id, message) in port.queue
+            ]
+            for port_schema, port in self._input_ports.items()
+            if port_schema != first_port_schema
+        }
 
         for anchor_idx, (anchor_parents, timestamp, unique_id, message) in enumerate(first_port.queue):
             chain_parents = self.extract_parents_with_suffix(anchor_parents)
@@ -164,14 +176,13 @@ class MultiPortAgent(ConnectedAgent):
 
             candidate_indices: List[int] = []
 
-            for port_schema, port in self._input_ports.items():
+            for port_schema in self._input_ports:
                 if port_schema == first_port_schema:
                     candidate_indices.append(anchor_idx)
                     continue
 
                 found = None
-                for idx, (parents, timestamp, unique_id, message) in enumerate(port.queue):
-                    candidate_suffixes = {":" + ":".join(p.split(":")[1:]) for p in parents if p.count(":") >= 2}
+                for idx, candidate_suffixes in enumerate(port_suffixes[port_schema]):
                     if search_keys.issubset(candidate_suffixes):
                         found = idx
                         break
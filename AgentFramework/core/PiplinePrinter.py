@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import hashlib
 from collections import defaultdict
 from pathlib import Path
 from typing import (
@@ -13,6 +14,7 @@ from typing import (
     Type,
 )
 import subprocess
+import sys
 
 """
 pipeline_printer.py – quick visualisation helpers for the Agent-Framework.
@@ -85,10 +87,21 @@ class PipelinePrinter:
         edges = self._collect_edges(list(agents))
         return self._mermaid(edges)
 
-    def save_as_png(self, agents: Iterable["ConnectedAgent"], png_path: Union[str, Path]):
+    def save_as_png(self, agents: Iterable["ConnectedAgent"], png_path: Union[str, Path], force: bool = False):
+        """
+        Render the pipeline with GraphViz `dot`. Rendering is skipped if the PNG
+        was already made from the same DOT source, unless `force` is set; the
+        hash of that source is kept in a `.stamp` file next to the PNG.
+        """
         png_path = Path(png_path)
-        dot_str = self.to_dot(agents)
-        subprocess.run(["dot", "-Tpng", "-Gdpi=300", "-o", str(png_path)], input=dot_str.encode("utf-8"),check=True,)
+        dot_bytes = self.to_dot(agents).encode("utf-8")
+        digest = hashlib.blake2b(dot_bytes, digest_size=8).hexdigest()
+        stamp_path = png_path.with_name(png_path.name + ".stamp")
+        if not force and png_path.exists() and stamp_path.exists() and stamp_path.read_text() == digest:
+            print(f"PNG up to date: {png_path}")
+            return
+        subprocess.run(["dot", "-Tpng", "-Gdpi=300", "-o", str(png_path)], input=dot_bytes,check=True,)
+        stamp_path.write_text(digest)
         print(f"PNG generated: {png_path}")
 
     # ------------------------------------------------------------------ internal logic
@@ -232,11 +245,12 @@ class PipelinePrinter:
 
     # ------------------------------------------------------------------ renderers
     def _ascii(self, edges):
+        lines: List[str] = []
         for src, targets in edges.items():
             clean_src = " ".join(src.splitlines()).strip()
             if not targets:
                 continue  # skip if no outgoing edges
-            print(clean_src)
+            lines.append(clean_src)
             for i, (tgt, tgt_suf, src_suf, *_rest) in enumerate(targets):
                 connector = "└─▶" if i == len(targets) - 1 else "├─▶"
                 clean_tgt = " ".join(tgt.splitlines()).strip()
@@ -248,7 +262,11 @@ class PipelinePrinter:
                 # Compose label with fallback parts
                 msg = f"{clean_src_suf} → {clean_tgt_suf}"
                 label = f"[{msg}]"
-                print(f"  {connector} {clean_tgt}: {label}")
+                lines.append(f"  {connector} {clean_tgt}: {label}")
+        # One write instead of a print per line
+        if lines:
+            sys.stdout.write("\n".join(lines) + "\n")
+            sys.stdout.flush()
 
 
     def _dot(self, edges) -> str:
@@ -1,6 +1,6 @@
-from typing import List, Dict
+from typing import List, Dict, Union
 
-from pydantic import Field
+from pydantic import BaseModel, Field
 
 from atomic_agents.lib.base.base_io_schema import BaseIOSchema
 from atomic_agents.lib.base.base_tool import BaseToolConfig
@@ -25,11 +25,21 @@ class CounterSchema(BaseIOSchema):
     """
     counts: Dict[str,int] = Field(..., description="Current count.",)
 
+class CounterAgentState(BaseModel):
+    """Running totals of single counter messages"""
+
+    counts: Dict[str,int] = Field(default_factory=dict, description="Summed counts so far.")
+    received: Dict[str,int] = Field(default_factory=dict, description="Messages received per split list.")
+
+
 class CounterAgent(ConnectedAgent):
     """
     An agent that just counts a list input of counter types.
     Tyically a transformer sets the values of a coutner state and
     this agents sums them all up.
+    A single CounterSchema (no collector in front) is added to running
+    totals, so the counts stream without keeping the whole list. The totals
+    are sent once, when the last message of the split list has arrived.
 
     Attributes:
         input_schema (Type[BaseIOSchema]): Defines the expected input schema.
@@ -37,6 +47,9 @@ class CounterAgent(ConnectedAgent):
     """
     input_schema = BaseIOSchema
     output_schema = NullSchema
+    # --- State -----------------------------------------------------------
+    state_schema = CounterAgentState
+    _state: CounterAgentState
 
     def __init__(self, config: CounterAgentConfig, **kwargs) -> None:
         """
@@ -44,20 +57,63 @@ class CounterAgent(ConnectedAgent):
         """
         super().__init__(config, **kwargs)
         self._config = config
+        self._state = CounterAgentState()
 
 
-    def run(self, params: ListModel[CounterSchema]) -> CounterSchema:
+    def process(self, params: BaseIOSchema, parents: List[str], unique_id:str = None) -> BaseIOSchema:
+        """
+        Sums a single CounterSchema into the totals and sends them when its list is
+        complete; a ListModel is summed by `run`.
+        """
+        if not isinstance(params, CounterSchema):
+            return self.call_advanced_run(params, unique_id)
+        self._add(params)
+        if not self._list_complete(parents):
+            return NullSchema()
+        return CounterSchema.model_construct(counts = dict(self._state.counts))
+
+    def _add(self, params: CounterSchema) -> None:
+        totals = self._state.counts
+        for field in self._config.counter_fields:
+            totals[field] = totals.get(field, 0) + params.counts.get(field, 0)
+
+    def _list_complete(self, parents: List[str]) -> bool:
+        """
+        Counts the message for the split list named by the last 'uuid:index:length'
+        parent with a length > 1 and tells whether it was the last missing one.
+        """
+        for pos in range(len(parents) - 1, -1, -1):
+            parts = parents[pos].rsplit(":", 2)
+            if len(parts) == 3 and parts[2] != "1":
+                length = int(parts[2])
+                break
+        else:
+            # Not part of a split list
+            return True
+        key = "|".join(parents[:pos] + [parts[0]])
+        received = self._state.received
+        received[key] = received.get(key, 0) + 1
+        if received[key] < length:
+            return False
+        del received[key]
+        return True
+
+    def run(self, params: Union[ListModel[CounterSchema], CounterSchema]) -> CounterSchema:
         """
         Runs the agent.
 
         Args:
-            params (MessageInput): The input parameters for the message.
+            params (Union[ListModel[CounterSchema], CounterSchema]): The collected counters, or a single one.
 
         Returns:
-            MessageOutput: The output containing success status and message.
+            CounterSchema: The summed counts; for a single counter the running totals.
         """
-        current_counts = {field: 0 for field in self._config.counter_fields}
-        for data in params.data:
-            for field in self._config.counter_fields:
-                current_counts[field] += data.counts.get(field, 0)
-        return CounterSchema(counts = current_counts)
\ No newline at end of file
+        if isinstance(params, CounterSchema):
+            self._add(params)
+            return CounterSchema.model_construct(counts = dict(self._state.counts))
+
+        # One C level sum per field; the totals are plain ints, so no validation is needed.
+        counts = [data.counts for data in params.data]
+        current_counts = {field: sum(count.get(field, 0) for count in counts)
+                          for field in self._config.counter_fields}
+        return CounterSchema.model_construct(counts = current_counts)
@@ -1,4 +1,4 @@
-from typing import Type
+from typing import Optional, Type
 
 from pydantic import BaseModel, TypeAdapter
 
@@ -7,15 +7,20 @@ from atomic_agents.lib.base.base_tool import BaseToolConfig
 
 from AgentFramework.core.ConnectedAgent import ConnectedAgent
 from agent_logging import rich_console
+from util import fast_json
 
 
 class LoadJsonAgentConfig(BaseToolConfig):
     """
     Configuration for LoadJsonAgent.
     Stores the filename from which the JSON will be loaded.
+    If max_items is set, the list field items_field of the loaded model is
+    cut to its first max_items entries (debug runs over a few items).
     """
     filename: str
     model_class: Type[BaseModel]
+    max_items: Optional[int] = None
+    items_field: Optional[str] = None
 
 
 class LoadJsonAgent(ConnectedAgent):
@@ -40,6 +45,8 @@ class LoadJsonAgent(ConnectedAgent):
         super().__init__(config, **kwargs)
         self.filename = config.filename
         self.model_class = config.model_class
+        self.max_items = config.max_items
+        self.items_field = config.items_field
 
     def run(self, params: BaseModel) -> BaseModel:
         """
@@ -68,8 +75,17 @@ class LoadJsonAgent(ConnectedAgent):
         Returns:
             BaseModel: The deserialized model instance.
         """
-        with open(filepath, 'r', encoding='utf-8') as f:
+        # Bytes go straight into pydantic's JSON parser, no decode to str
+        with open(filepath, 'rb') as f:
             json_data = f.read()
 
+        if isinstance(model_class, type) and issubclass(model_class, BaseModel):
+            if self.max_items is not None and self.items_field:
+                # Only the kept items are validated
+                raw = fast_json.loads(json_data)
+                raw[self.items_field] = raw[self.items_field][:self.max_items]
+                return model_class.model_validate(raw)
+            return model_class.model_validate_json(json_data)
+
         adapter = TypeAdapter(model_class)
         return adapter.validate_json(json_data)
\ No newline at end of file
@@ -1,5 +1,6 @@
 import os
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 
 from pydantic import BaseModel, TypeAdapter
 
@@ -8,7 +9,7 @@ from atomic_agents.lib.base.base_tool import BaseToolConfig
 
 from AgentFramework.core.ConnectedAgent import ConnectedAgent
 from AgentFramework.core.NullSchema import NullSchema
-from agent_logging import rich_console
+from agent_logging import rich_console, logger
 
 
 class SaveJsonAgentConfig(BaseToolConfig):
@@ -18,6 +19,8 @@ class SaveJsonAgentConfig(BaseToolConfig):
     """
     filename: str
     use_uuid: bool = False
+    async_io: bool = False  # Write the files in a background thread
+    append_mode: bool = False  # Append every message as one line to a single JSONL file
 
 
 class SaveJsonAgent(ConnectedAgent):
@@ -41,6 +44,15 @@ class SaveJsonAgent(ConnectedAgent):
         self.filename = config.filename
         self._data = None  # to store the last received data
         self._use_uuid = config.use_uuid
+        # One worker keeps the writes in order, e.g. when the same file is overwritten.
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="SaveJsonAgent") if config.async_io else None
+        # First failed background write, raised by flush() / close()
+        self._write_error: Optional[BaseException] = None
+        # In append mode one file stays open for the whole run, opened on the first write.
+        # A fresh run truncates it, a restored run continues it.
+        self._append_mode = config.append_mode
+        self._append_file = None
+        self._append_fresh = True
 
     def process(self, params: BaseIOSchema, parents: List[str], unique_id:str = None) -> BaseIOSchema:
         """
@@ -68,6 +80,16 @@ class SaveJsonAgent(ConnectedAgent):
         # Store the data internally
         self._data = params
 
+        if self._append_mode:
+            line = params.model_dump_json().encode("utf-8") + b"\n"
+            if self._append_file is None:
+                self._open_append_file()
+            if self._writer is not None:
+                self._writer.submit(self._append_file.write, line).add_done_callback(self._log_write_error)
+            else:
+                self._append_file.write(line)
+            return NullSchema()
+
         if self._use_uuid:
             # cleaned_list = [item.split(':')[0] if ':' in item else item for item in parents]
             # parent = cleaned_list[-1]
@@ -95,12 +117,71 @@ class SaveJsonAgent(ConnectedAgent):
             if dir_path:  # skip if filepath is just a filename in the current directory
                 os.makedirs(dir_path, exist_ok=True)
 
-            # Create a TypeAdapter for the type of the data received
-            adapter = TypeAdapter(type(self._data))
-            # dump_json returns bytes; decode to get a string
-            json_bytes = adapter.dump_json(self._data, indent=2)
-            json_str = json_bytes.decode('utf-8') if isinstance(json_bytes, bytes) else json_bytes
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(json_str)
+            if isinstance(self._data, BaseModel):
+                # The model's own serializer, no TypeAdapter (schema build) per save
+                json_str = self._data.model_dump_json(indent=2)
+            else:
+                # Create a TypeAdapter for the type of the data received
+                adapter = TypeAdapter(type(self._data))
+                # dump_json returns bytes; decode to get a string
+                json_str = adapter.dump_json(self._data, indent=2).decode('utf-8')
+            if self._writer is not None:
+                self._writer.submit(self._write_file, filepath, json_str).add_done_callback(self._log_write_error)
+            else:
+                self._write_file(filepath, json_str)
+
+    def _open_append_file(self) -> None:
+        dir_path = os.path.dirname(self.filename)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        self._append_file = open(self.filename, "wb" if self._append_fresh else "ab", buffering=1 << 20)
+        self._append_fresh = False
+
+    def load_state(self, state_dict: dict):
+        super().load_state(state_dict)
+        # The lines of the restored run are already in the file
+        self._append_fresh = False
+
+    @staticmethod
+    def _write_file(filepath: str, json_str: str) -> None:
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(json_str)
+
+    def _log_write_error(self, future) -> None:
+        error = future.exception()
+        if error is not None:
+            logger.error(f"SaveJsonAgent background write failed: {error}")
+            if self._write_error is None:
+                self._write_error = error
+
+    def flush(self) -> None:
+        """
+        Wait until all pending writes are handed to the operating system.
+        Raises the first error of a background write.
+        """
+        if self._writer is not None:
+            # The single worker runs in order, so this returns after all earlier writes.
+            self._writer.submit(lambda: None).result()
+        if self._append_file is not None:
+            self._append_file.flush()
+        if self._write_error is not None:
+            error, self._write_error = self._write_error, None
+            raise error
+
+    def close(self) -> None:
+        """
+        Flush pending writes, stop the writer thread and close the JSONL file
+        of the append mode. A later write reopens the file and appends to it,
+        without the background thread.
+        """
+        try:
+            self.flush()
+        finally:
+            if self._writer is not None:
+                self._writer.shutdown(wait=True)
+                self._writer = None
+            if self._append_file is not None:
+                self._append_file.close()
+                self._append_file = None
 
 
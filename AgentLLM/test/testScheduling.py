@@ -0,0 +1,61 @@
+# tests/test_scheduling.py
+import asyncio
+import unittest
+
+from AgentFramework.core.AgentScheduler import AgentScheduler
+
+from AgentLLM.test.TestModels import EchoAgent, Msg
+
+
+class AsyncUpperAgent(EchoAgent):
+    """
+    Async agent like the LLM agents: later messages finish first, so the
+    schedulers have to restore the input order.
+    """
+
+    async def arun(self, params: Msg) -> Msg:
+        await asyncio.sleep(0.001 * (len(params.text) % 5))
+        return Msg(text=params.text.upper())
+
+    def run(self, params: Msg) -> Msg:
+        return Msg(text=params.text.upper())
+
+
+def build_pipeline():
+    source = EchoAgent(uuid="source")
+    upper = AsyncUpperAgent(uuid="upper")
+    sink = EchoAgent(uuid="sink")
+    source.connectTo(upper)
+    upper.connectTo(sink)
+
+    scheduler = AgentScheduler(uuid="scheduling")
+    for agent in (source, upper, sink):
+        scheduler.add_agent(agent)
+    scheduler.freeze()
+
+    for i in range(25):
+        source.feed(Msg(text=f"message {'x' * i} {i}"))
+    return scheduler, sink
+
+
+class TestScheduling(unittest.TestCase):
+
+    def setUp(self):
+        scheduler, sink = build_pipeline()
+        scheduler.step_all()
+        self.expected = [msg.text for msg in sink.get_final_outputs()]
+        self.assertEqual(len(self.expected), 25)
+
+    def test_async_matches_step_all(self):
+        scheduler, sink = build_pipeline()
+        scheduler.step_all_async(max_batch=4)
+        self.assertEqual([msg.text for msg in sink.get_final_outputs()], self.expected)
+
+    def test_pipelined_matches_step_all(self):
+        scheduler, sink = build_pipeline()
+        scheduler.step_all_pipelined(max_in_flight=4)
+        self.assertEqual([msg.text for msg in sink.get_final_outputs()], self.expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
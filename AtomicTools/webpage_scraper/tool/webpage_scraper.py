@@ -178,44 +178,60 @@ class WebpageScraperTool(BaseTool):
         # Fetch webpage content
         try:
             html_content = self._fetch_webpage(str(params.url))
+            return self._html_to_output(html_content, params)
+        except Exception as e:
+            return self._error_output(e)
+
+    def _error_output(self, error: Exception) -> WebpageScraperToolOutputSchema:
+        """Result for a page that could not be fetched or parsed."""
+        metadata = WebpageMetadata(title="",domain="")
+        return WebpageScraperToolOutputSchema(
+            content="",
+            error=f"{error}",
+            metadata=metadata,
+        )
 
-            # Parse HTML with BeautifulSoup
-            soup = BeautifulSoup(html_content, "html.parser")
+    def _html_to_output(self, html_content: str, params: WebpageScraperToolInputSchema) -> WebpageScraperToolOutputSchema:
+        """
+        Converts fetched HTML into the markdown content and metadata of the page.
 
-            # Extract main content using custom extraction
-            main_content = self._extract_main_content(soup)
+        Args:
+            html_content (str): The HTML of the page.
+            params (WebpageScraperToolInputSchema): The input parameters for the tool.
 
-            # Convert to markdown
-            markdown_options = {
-                "strip": ["script", "style"],
-                "heading_style": "ATX",
-                "bullets": "-",
-                "wrap": True,
-            }
+        Returns:
+            WebpageScraperToolOutputSchema: The output containing the markdown content and metadata.
+        """
+        # Parse HTML with BeautifulSoup
+        soup = BeautifulSoup(html_content, "html.parser")
+
+        # Extract main content using custom extraction
+        main_content = self._extract_main_content(soup)
+
+        # Convert to markdown
+        markdown_options = {
+            "strip": ["script", "style"],
+            "heading_style": "ATX",
+            "bullets": "-",
+            "wrap": True,
+        }
 
-            if not params.include_links:
-                markdown_options["strip"].append("a")
+        if not params.include_links:
+            markdown_options["strip"].append("a")
 
-            markdown_content = markdownify(main_content, **markdown_options)
+        markdown_content = markdownify(main_content, **markdown_options)
 
-            # Clean up the markdown
-            markdown_content = self._clean_markdown(markdown_content)
+        # Clean up the markdown
+        markdown_content = self._clean_markdown(markdown_content)
 
-            # Extract metadata
-            metadata = self._extract_metadata(soup, Document(html_content), str(params.url))
+        # Extract metadata
+        metadata = self._extract_metadata(soup, Document(html_content), str(params.url))
 
-            return WebpageScraperToolOutputSchema(
-                content=markdown_content,
-                error=None,
-                metadata=metadata,
-            )
-        except Exception as e:
-            metadata = WebpageMetadata(title="",domain="")
-            return WebpageScraperToolOutputSchema(
-                content="",
-                error=f"{e}",
-                metadata=metadata,
-            )
+        return WebpageScraperToolOutputSchema(
+            content=markdown_content,
+            error=None,
+            metadata=metadata,
+        )
 
 
 #################
@@ -1,2 +1,3 @@
 DUMMY_LLM = False
-DUMMY_WEB = False
\ No newline at end of file
+DUMMY_WEB = False
+HTTP_WEB = False
\ No newline at end of file
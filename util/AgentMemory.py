@@ -8,7 +8,8 @@ Key improvements
   via ``model_dump*`` / ``model_convert*`` helpers – no custom ``dump`` / ``load``
   methods required.
 * Clear, concise public API: ``add_message``, ``new_turn``, ``get_history``.
-* Overflow handled with slice‑assignment for speed and clarity.
+* History kept in a ``deque`` bounded by ``max_messages`` – O(1) appends, the
+  oldest messages drop out automatically.
 * Convenience ``to_json`` / ``from_json`` helpers for explicit JSON round‑trips.
 * Fully‑typed, minimal surface – easy to understand, extend, and test.
 
@@ -16,9 +17,11 @@ The class is drop‑in compatible with the original but safer and more pythonic.
 """
 
 import uuid
-from typing import List, Optional, Union
+from collections import deque
+from itertools import islice
+from typing import Deque, List, Optional, Union
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 
 
@@ -42,13 +45,20 @@ class AgentMemory(BaseModel):
         Maximum number of messages to keep. If ``None`` the history is unbounded.
     """
 
-    history: List[Message] = Field(default_factory=list)
+    history: Deque[Message] = Field(default_factory=deque)
     max_messages: Optional[int] = None
     current_turn_id: Optional[str] = None
 
     # Allow arbitrary ``BaseIOSchema`` subclasses inside the model
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
+    @model_validator(mode="after")
+    def _bound_history(self) -> "AgentMemory":
+        """Give the history deque the ``max_messages`` bound (also after loading)."""
+        if self.history.maxlen != self.max_messages:
+            self.history = deque(self.history, maxlen=self.max_messages)
+        return self
+
     # ---------------------------------------------------------------------
     # Public helpers
     # ---------------------------------------------------------------------
@@ -86,7 +96,7 @@ class AgentMemory(BaseModel):
         """
         # Determine slice: last n messages or all
         if n is not None and n > 0:
-            recent = self.history[-n:]
+            recent = list(islice(self.history, max(0, len(self.history) - n), None))
         else:
             recent = list(self.history)
 
@@ -171,7 +181,11 @@ class AgentMemory(BaseModel):
     # ------------------------------------------------------------------
 
     def _manage_overflow(self) -> None:
-        """Enforce the ``max_messages`` cap – drop *oldest* messages first."""
-        if self.max_messages is not None and len(self.history) > self.max_messages:
-            # Keep only the *newest* ``max_messages`` elements.
-            self.history[:] = self.history[-self.max_messages:]
+        """Enforce the ``max_messages`` cap – drop *oldest* messages first.
+
+        The deque's ``maxlen`` already does this; only needed if ``max_messages``
+        was changed after construction.
+        """
+        if self.max_messages is not None:
+            while len(self.history) > self.max_messages:
+                self.history.popleft()
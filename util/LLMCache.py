@@ -0,0 +1,70 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+
+class LLMCache:
+    """
+    Persistent cache of LLM replies, keyed by a hash of the request.
+
+    The entries are kept in one append-only JSONL file, which is read into a
+    dictionary when the cache is opened. Re-runs over the same pages get the
+    earlier replies without calling the LLM.
+    """
+
+    def __init__(self, filename: str) -> None:
+        """
+        Opens the cache file, creating it if necessary.
+
+        Parameters:
+            filename (str): Path of the JSONL cache file.
+        """
+        self.filename = filename
+        self._entries: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(filename):
+            with open(filename, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A run that was killed mid-write leaves a truncated last line
+                        continue
+                    self._entries[entry["key"]] = entry["value"]
+        dir_path = os.path.dirname(filename)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+
+    @staticmethod
+    def key(*parts: Optional[str]) -> str:
+        """
+        Hash the parts of a request (model, prompts, ...) into a cache key.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            digest.update((part or "").encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Returns the cached reply for the key, or None.
+        """
+        return self._entries.get(key)
+
+    def put(self, key: str, value: str) -> None:
+        """
+        Stores a reply and appends it to the cache file.
+        """
+        line = json.dumps({"key": key, "value": value}, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._entries[key] = value
+            with open(self.filename, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def __len__(self) -> int:
+        return len(self._entries)
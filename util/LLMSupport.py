@@ -1,10 +1,15 @@
+import asyncio
+import functools
 import glob
 import logging
 import os
 import json
 import os
 import re
+import threading
+import time
 import traceback
+import uuid
 from enum import Enum
 from typing import Optional, List, Dict, Any, Type, Union, Callable, Tuple
 
@@ -15,7 +20,7 @@ nltk.download("punkt")
 nltk.download('punkt_tab')
 
 from atomic_agents.lib.base.base_tool import BaseToolConfig
-from openai import OpenAI, NOT_GIVEN
+from openai import AsyncOpenAI, OpenAI, NOT_GIVEN
 from openai.types import CompletionUsage
 from pydantic import BaseModel, Field
 from tenacity import retry, wait_exponential, stop_after_attempt, before_log, retry_if_exception_type, before_sleep_log, RetryCallState
@@ -101,10 +106,69 @@ class LLMAgentConfig(BaseToolConfig):
     timeout: Optional[int] = Field(None, description="llm timeout in sec")
     use_response: Optional[bool] = Field(None, description="Utilize repsonse format if avaialble")
     use_memory: Optional[bool] = Field(default=False, description="Utilizeagent memory")
+    use_batch_api: Optional[bool] = Field(default=False, description="Send the messages of a step_all_async round through the provider batch API if available")
+    max_concurrency: Optional[int] = Field(default=16, description="Maximum parallel LLM requests of async agents")
+    cache_file: Optional[str] = Field(None, description="JSONL file caching the LLM replies across runs")
+    requests_per_minute: Optional[int] = Field(None, description="Request limit shared by all models of the provider, the first config sets it")
 
 
 
+class RateLimiter:
+    """
+    Spaces requests evenly to at most `rate` per `period` seconds.
+
+    Every call reserves the next free slot under a thread lock, so one
+    limiter works for sync calls and for any number of threads and event loops.
+    """
+
+    def __init__(self, rate: int, period: float = 60.0):
+        self.rate = rate
+        self.period = period
+        self._interval = period / rate
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Reserves a slot and returns the seconds to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self._interval
+            return slot - now
+
+    def wait(self) -> None:
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire(self) -> None:
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# One limiter per provider, shared by all agents using it
+RATE_LIMITERS: Dict[Provider, RateLimiter] = {}
+
+
+def provider_rate_limiter(provider: Provider, requests_per_minute: int) -> RateLimiter:
+    """
+    The limiter of `provider`, created by its first agent. A different rate of
+    a later agent is ignored with a warning, the provider has one limit.
+    """
+    limiter = RATE_LIMITERS.get(provider)
+    if limiter is None:
+        limiter = RATE_LIMITERS[provider] = RateLimiter(requests_per_minute)
+    elif limiter.rate != requests_per_minute:
+        logger.warning(f"{provider} is already limited to {limiter.rate} requests per minute, "
+                       f"ignoring {requests_per_minute}")
+    return limiter
+
+
 class LLMModel:
+    # Log directories already cleared in this process
+    _log_files_cleared: Dict[str, bool] = {}
+
     def __init__(
         self,
         config:LLMAgentConfig,
@@ -124,6 +188,7 @@ class LLMModel:
 
         api_key = config.api_key
         self._thinking = False
+        self._hasBatchApi = False
 
         if config.provider == Provider.NANOGPT:
             self.base_url = NANO_GPT_BASE_URL
@@ -140,12 +205,14 @@ class LLMModel:
             self._maxToken = NOT_GIVEN
             self._hasSysPrompt = True
             self._hasResponseFormat = True
+            self._hasBatchApi = True
             self._thinking = True
         elif config.provider == Provider.OPENAI:
             self.base_url = None
             self._maxToken = NOT_GIVEN
             self._hasSysPrompt = True
             self._hasResponseFormat = True
+            self._hasBatchApi = True
         elif config.provider == Provider.OLLAMA:
             self.base_url = config.base_url
             self._maxToken = NOT_GIVEN
@@ -177,8 +244,15 @@ class LLMModel:
             raise Exception("No API key provided. Provide at least empty string.")
 
         self.client =  OpenAI(api_key=api_key, base_url=self.base_url)
+        # Async client, only created when the async methods are used.
+        self._api_key = api_key
+        self._aclient: Optional[AsyncOpenAI] = None
+        self._aclient_loop: Optional[asyncio.AbstractEventLoop] = None
         self._model = config.model
         self._provider = config.provider
+        self._rate_limiter: Optional[RateLimiter] = None
+        if config.requests_per_minute:
+            self._rate_limiter = provider_rate_limiter(config.provider, config.requests_per_minute)
 
     def setMaxToken(self,max_token):
         self._maxToken = max_token
@@ -192,7 +266,20 @@ class LLMModel:
     def hasSysPrompt(self):
         return self._hasSysPrompt
 
+    def hasBatchApi(self):
+        return self._hasBatchApi and not self.config.base_url
+
     def create_text_completions(self, sysprompt, user_prompt, temperature: Optional[float] = None) -> Any:
+        messages = self._text_messages(sysprompt, user_prompt)
+        response = self.create_completions(messages, temperature)
+        # Extract the updated emotional states from the response
+        usage = response.usage
+        llm_text = response.choices[0].message.content
+        logger.info(f"... external LLM data received: {len(llm_text)} characters")
+        logger.info(f"LLM Usage {usage}")
+        return llm_text, usage
+
+    def _text_messages(self, sysprompt, user_prompt) -> List[Dict[str, str]]:
         # Prepare messages for the OpenAI API
         if self.hasSysPrompt():
             #logger.info(f"System prompt supported for model {self.name()}")
@@ -204,14 +291,7 @@ class LLMModel:
             # model {self.name()}")
             messages = [{"role": "user", "content": f"{sysprompt}\n{user_prompt}"}]
             #logger.debug(f"Prompt is: {sysprompt}\n{user_prompt}")
-
-        response = self.create_completions(messages, temperature)
-        # Extract the updated emotional states from the response
-        usage = response.usage
-        llm_text = response.choices[0].message.content
-        logger.info(f"... external LLM data received: {len(llm_text)} characters")
-        logger.info(f"LLM Usage {usage}")
-        return llm_text, usage
+        return messages
 
     def create_completions(
         self,
@@ -229,7 +309,20 @@ class LLMModel:
         Returns:
             Any: The API response from openai.ChatCompletion.create.
         """
+        kwargs = self._completion_args(temperature)
+        self.write_llm_messages(messages)
+        if self._rate_limiter:
+            self._rate_limiter.wait()
+        response = self.client.chat.completions.create(messages=messages, **kwargs)
+        #logger.debug("LLM: Resopnse " ,response)
+
+        return response
 
+    def _completion_args(self, temperature: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Request arguments (without the messages) of a text completion, shared by
+        the sync and async calls.
+        """
         if not temperature:
             temperature = NOT_GIVEN
 
@@ -241,16 +334,10 @@ class LLMModel:
             maxToken =  NOT_GIVEN
             temperature = NOT_GIVEN
 
-        self.write_llm_messages(messages)
-        response = self.client.chat.completions.create(model=self._model,
-                                                       messages=messages,
-                                                       temperature=temperature,
-                                                       max_tokens=maxToken,
-                                                       max_completion_tokens=maxCompletionToken
-                                                       )
-        #logger.debug("LLM: Resopnse " ,response)
-
-        return response
+        return dict(model=self._model,
+                    temperature=temperature,
+                    max_tokens=maxToken,
+                    max_completion_tokens=maxCompletionToken)
 
     @classmethod
     def openai_schema(cls, type_: Type):
@@ -261,29 +348,23 @@ class LLMModel:
         schema_dict.pop("$defs", None)
         return schema_dict
 
-    def create_json_completions(
-        self,
-        messages: List[Dict[str, str]],
-        schema_name: str,
-        schema_input: Union[Dict, type],
-        temperature: Optional[float] = None
-    ) -> Any:
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def schema_template(cls, type_: Type) -> str:
         """
-        Call the OpenAI Chat Completion API and instruct the model to follow a JSON schema.
-
-        This method appends a system prompt that instructs the model to output its response
-        in JSON format following the provided schema.
-
-        Args:
-            messages (List[Dict[str, str]]): A list of messages to be sent to the model.
-            schema_name (str): The name of the JSON schema.
-            schema_input (Union[Dict, type]): A dictionary representing the schema, or a Pydantic BaseModel class.
-            temperature (Optional[float]): The sampling temperature for the model.
-
-        Returns:
-            Any: The API response from openai.ChatCompletion.create.
+        JSON template text of the openai schema of a pydantic type, as used in
+        prompts. It only depends on the type, so it is built once per type.
         """
+        return generate_template_json(cls.openai_schema(type_))
 
+    def _json_completion_args(self,
+                              schema_name: str,
+                              schema_input: Union[Dict, type],
+                              temperature: Optional[float] = None) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Request arguments (without the messages) of a JSON completion, shared by
+        the sync and async calls. Returns whether the beta parse API is needed.
+        """
         is_beta = False
         if isinstance(schema_input, type) and issubclass(schema_input, BaseModel):
             response_format = schema_input
@@ -308,7 +389,6 @@ class LLMModel:
 
         timeout = self.config.timeout
 
-
         logger.info(f"Calling model {self.model()} json strict token={self._maxToken} temperature={temperature} timeout={timeout}")
         maxToken = self._maxToken
         maxCompletionToken = NOT_GIVEN
@@ -317,25 +397,45 @@ class LLMModel:
             maxToken =  NOT_GIVEN
             temperature = NOT_GIVEN
 
+        return is_beta, dict(model=self._model,
+                             response_format=response_format,
+                             temperature=temperature,
+                             max_tokens=maxToken,
+                             max_completion_tokens=maxCompletionToken,
+                             timeout=timeout)
+
+    def create_json_completions(
+        self,
+        messages: List[Dict[str, str]],
+        schema_name: str,
+        schema_input: Union[Dict, type],
+        temperature: Optional[float] = None
+    ) -> Any:
+        """
+        Call the OpenAI Chat Completion API and instruct the model to follow a JSON schema.
+
+        This method appends a system prompt that instructs the model to output its response
+        in JSON format following the provided schema.
+
+        Args:
+            messages (List[Dict[str, str]]): A list of messages to be sent to the model.
+            schema_name (str): The name of the JSON schema.
+            schema_input (Union[Dict, type]): A dictionary representing the schema, or a Pydantic BaseModel class.
+            temperature (Optional[float]): The sampling temperature for the model.
+
+        Returns:
+            Any: The API response from openai.ChatCompletion.create.
+        """
+
+        is_beta, kwargs = self._json_completion_args(schema_name, schema_input, temperature)
+
         self.write_llm_messages(messages)
+        if self._rate_limiter:
+            self._rate_limiter.wait()
         if is_beta:
-            response = self.client.beta.chat.completions.parse(model=self._model,
-                                                                messages=messages,
-                                                                response_format=response_format,
-                                                                temperature=temperature,
-                                                                max_tokens=maxToken,
-                                                                max_completion_tokens=maxCompletionToken,
-                                                                timeout=timeout
-                                                                )
+            response = self.client.beta.chat.completions.parse(messages=messages, **kwargs)
         else:
-            response = self.client.chat.completions.create(model=self._model,
-                                                           messages=messages,
-                                                           response_format=response_format,
-                                                           temperature=temperature,
-                                                           max_tokens=maxToken,
-                                                           max_completion_tokens=maxCompletionToken,
-                                                           timeout=timeout
-                                                           )
+            response = self.client.chat.completions.create(messages=messages, **kwargs)
             logger.info("Done openai call")
 
 
@@ -421,6 +521,19 @@ class LLMModel:
     def delete_log_files(self):
         LLMModel.delete_all_log_files(self.log_dir)
 
+    def delete_log_files_once(self):
+        """
+        Clear the log files once per log directory and process, so agents
+        sharing a directory do not delete each other's logs of this run.
+        """
+        if not self.log_dir:
+            return
+        log_dir = os.path.abspath(self.log_dir)
+        if LLMModel._log_files_cleared.get(log_dir):
+            return
+        LLMModel._log_files_cleared[log_dir] = True
+        LLMModel.delete_all_log_files(log_dir)
+
     @staticmethod
     def delete_all_log_files(log_dir:str):
         if not log_dir or not os.path.exists(log_dir):
@@ -429,6 +542,22 @@ class LLMModel:
         for file in glob.glob(pattern):
             os.remove(file)
 
+    def _pydantic_messages(self, sysprompt: Optional[str], user_prompt: str, attempt: int = 0) -> List[Dict[str, str]]:
+        if self.hasSysPrompt():
+            # logger.warning(f"System prompt supported for model {self.name()}")
+            messages = [{"role": "system", "content": sysprompt}] if sysprompt else []
+            messages.append({"role": "user", "content": user_prompt})
+        else:
+            # logger.warning(f"Merging system prompt in prompt for model {self.name()}")
+            messages = [{"role": "user", "content": f"{sysprompt}\n{user_prompt}"}]
+            # logger.debug(f"Prompt is: {sysprompt}\n{user_prompt}")
+        if attempt > 2:
+            messages.append({
+                "role": "user",
+                "content": "Your output must be a completely valid JSON, no additional text before or after the JSON output. All fields of the template must be filled."
+            })
+        return messages
+
     # ------------------------------------------------------------------
     # High level methods
     # ------------------------------------------------------------------
@@ -455,19 +584,7 @@ class LLMModel:
 
         # Prepare messages for the OpenAI API
         sysprompt = sys_prompt
-        if self.hasSysPrompt():
-            # logger.warning(f"System prompt supported for model {self.name()}")
-            messages = [{"role": "system", "content": sysprompt}] if sysprompt else []
-            messages.append({"role": "user", "content": user_prompt})
-        else:
-            # logger.warning(f"Merging system prompt in prompt for model {self.name()}")
-            messages = [{"role": "user", "content": f"{sysprompt}\n{user_prompt}"}]
-            # logger.debug(f"Prompt is: {sysprompt}\n{user_prompt}")
-        if attempt > 2:
-            messages.append({
-                "role": "user",
-                "content": "Your output must be a completely valid JSON, no additional text before or after the JSON output. All fields of the template must be filled."
-            })
+        messages = self._pydantic_messages(sysprompt, user_prompt, attempt)
         try:
             logger.info(f"### Attempt #{attempt}: Calling external LLM {self.name()} for {title}")
             response = self.create_json_completions(messages, targetType.__name__, schema_dict, temperature)
@@ -486,23 +603,7 @@ class LLMModel:
                 self.write_llm_log("llm_prompt", user_prompt or "")
                 self.write_llm_log("llm_err", llm_text)
                 logger.error(f"Json or Pydantic error {e}")
-                llm_schema = generate_template_json(schema_dict)
-                prompt = f"""
-                    You are a JSON generator. Your task is to produce a **strictly valid JSON** object based on the input data and the provided schema.
-    
-                    - Do NOT include any extra commentary, markdown formatting, or quotes around the JSON.
-                    - The output must exactly match the schema structure and data types.
-    
-                    ### Input Data:
-                    {llm_text}
-    
-                    ### JSON Schema:
-                    {llm_schema}
-    
-                    Generate the corrected and valid JSON now:
-                    """
-
-                messages = [{"role": "user", "content": prompt}]
+                messages = self._repair_messages(llm_text, targetType)
                 response = self.create_json_completions(messages, targetType.__class__.__name__, schema_dict, 0.0)
                 llm_text = response.choices[0].message.content
                 llm_text = clean_json_string(llm_text)
@@ -526,6 +627,204 @@ class LLMModel:
 
         return result_object, usage
 
+    @staticmethod
+    def _parse_reply(llm_text: str, targetType: Type[BaseModel], fix_function: Optional[Callable[[str], str]]) -> BaseModel:
+        llm_text = clean_json_string(llm_text)
+        if fix_function:
+            llm_text = fix_function(llm_text)
+        return targetType(**json5.loads(llm_text))
+
+    @staticmethod
+    def _repair_messages(llm_text: str, targetType: Type[BaseModel]) -> List[Dict[str, str]]:
+        """Request to turn an invalid JSON reply into one matching the schema of `targetType`."""
+        llm_schema = LLMModel.schema_template(targetType)
+        prompt = f"""
+                    You are a JSON generator. Your task is to produce a **strictly valid JSON** object based on the input data and the provided schema.
+    
+                    - Do NOT include any extra commentary, markdown formatting, or quotes around the JSON.
+                    - The output must exactly match the schema structure and data types.
+    
+                    ### Input Data:
+                    {llm_text}
+    
+                    ### JSON Schema:
+                    {llm_schema}
+    
+                    Generate the corrected and valid JSON now:
+                    """
+        return [{"role": "user", "content": prompt}]
+
+    # ------------------------------------------------------------------
+    # Async methods
+    # ------------------------------------------------------------------
+    @property
+    def aclient(self) -> AsyncOpenAI:
+        # The connections of the client belong to one event loop, so every
+        # asyncio.run() gets its own client.
+        loop = asyncio.get_running_loop()
+        if self._aclient is None or self._aclient_loop is not loop:
+            self._aclient = AsyncOpenAI(api_key=self._api_key, base_url=self.base_url)
+            self._aclient_loop = loop
+        return self._aclient
+
+    async def aclose(self) -> None:
+        """
+        Close the async client of the running event loop. Await it before the
+        loop ends, e.g. at the end of the coroutine given to asyncio.run().
+        """
+        client, loop = self._aclient, self._aclient_loop
+        self._aclient = self._aclient_loop = None
+        # A client of another, finished loop cannot be closed from here
+        if client is not None and loop is asyncio.get_running_loop():
+            await client.close()
+
+    async def acreate_text_completions(self, sysprompt, user_prompt, temperature: Optional[float] = None) -> Any:
+        """
+        Async version of `create_text_completions`.
+        """
+        messages = self._text_messages(sysprompt, user_prompt)
+        kwargs = self._completion_args(temperature)
+        self.write_llm_messages(messages)
+        if self._rate_limiter:
+            await self._rate_limiter.acquire()
+        response = await self.aclient.chat.completions.create(messages=messages, **kwargs)
+        usage = response.usage
+        llm_text = response.choices[0].message.content
+        logger.info(f"... external LLM data received: {len(llm_text)} characters")
+        logger.info(f"LLM Usage {usage}")
+        return llm_text, usage
+
+    async def acomplete(
+        self,
+        messages: List[Dict[str, str]],
+        schema_name: str,
+        schema_input: Union[Dict, type],
+        temperature: Optional[float] = None
+    ) -> Any:
+        """
+        Async version of `create_json_completions`, so many requests can wait
+        on the network at the same time.
+        """
+        is_beta, kwargs = self._json_completion_args(schema_name, schema_input, temperature)
+
+        self.write_llm_messages(messages)
+        if self._rate_limiter:
+            await self._rate_limiter.acquire()
+        if is_beta:
+            response = await self.aclient.beta.chat.completions.parse(messages=messages, **kwargs)
+        else:
+            response = await self.aclient.chat.completions.create(messages=messages, **kwargs)
+
+        llm_text = response.choices[0].message.content
+        logger.info(f"... external LLM data received: {len(llm_text)} characters")
+        logger.info(f"LLM Usage {response.usage}")
+        self.write_llm_log("llm_out", llm_text)
+        return response
+
+    async def ahl_pydantic_completions(self,
+                                       sys_prompt: str,
+                                       user_prompt: str,
+                                       targetType: Type[BaseModel],
+                                       title='Default LLM call',
+                                       fix_function: Optional[Callable[[str], str]] = None
+                                       ) -> Tuple[BaseModel, CompletionUsage]:
+        """
+        Async version of `hl_pydantic_completions`. A reply that does not validate
+        is repaired from its own text, like the sync method does. Only if the
+        request or the repair fails, the sync method with its retries runs in a
+        worker thread.
+        """
+        schema_dict = LLMModel.openai_schema(targetType)
+        messages = self._pydantic_messages(sys_prompt, user_prompt)
+        try:
+            logger.info(f"### Async call of external LLM {self.name()} for {title}")
+            response = await self.acomplete(messages, targetType.__name__, schema_dict, 0.0)
+            usage = response.usage
+            llm_text = response.choices[0].message.content
+            try:
+                return self._parse_reply(llm_text, targetType, fix_function), usage
+            except Exception as e:
+                logger.error(f"Json or Pydantic error {e}")
+                self.write_llm_log("llm_err", llm_text)
+            response = await self.acomplete(self._repair_messages(llm_text, targetType),
+                                            targetType.__name__, schema_dict, 0.0)
+            return self._parse_reply(response.choices[0].message.content, targetType, fix_function), usage
+        except Exception as e:
+            logger.warning(f"Async LLM call '{title}' failed, retrying synchronously: {e}")
+        return await asyncio.to_thread(self.hl_pydantic_completions, sys_prompt, user_prompt,
+                                       targetType=targetType, title=title, fix_function=fix_function)
+
+    # ------------------------------------------------------------------
+    # Batch API
+    # ------------------------------------------------------------------
+    def batch_pydantic_completions(self,
+                                   prompts: List[Tuple[Optional[str], str]],
+                                   targetType: Type[BaseModel],
+                                   title='Default LLM batch',
+                                   fix_function: Optional[Callable[[str], str]] = None,
+                                   poll_interval: float = 30.0
+                                   ) -> List[Optional[BaseModel]]:
+        """
+        Runs many (system prompt, user prompt) requests through the OpenAI batch
+        API: upload a JSONL file, wait for the batch and download the replies.
+        Much cheaper than single calls, but it may take up to 24 hours.
+
+        Args:
+            prompts (List[Tuple[Optional[str], str]]): System and user prompt per request.
+            targetType (Type[BaseModel]): The type of every reply.
+            title (str): Name for logging.
+            fix_function (Optional[Callable[[str], str]]): Applied to each reply text before parsing.
+            poll_interval (float): Seconds between batch status checks.
+
+        Returns:
+            List[Optional[BaseModel]]: The replies in prompt order, None where a request failed.
+        """
+        if not self.hasBatchApi():
+            raise NotImplementedError(f"Provider {self._provider} has no batch API.")
+        schema_dict = LLMModel.openai_schema(targetType)
+        _, kwargs = self._json_completion_args(targetType.__name__, schema_dict, 0.0)
+        # The request body takes the plain arguments only.
+        kwargs.pop("timeout", None)
+        body = {key: value for key, value in kwargs.items() if value is not NOT_GIVEN}
+
+        custom_ids = [uuid.uuid4().hex for _ in prompts]
+        lines = []
+        for custom_id, (sys_prompt, user_prompt) in zip(custom_ids, prompts):
+            lines.append(json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {**body, "messages": self._pydantic_messages(sys_prompt, user_prompt)},
+            }, ensure_ascii=False))
+
+        logger.info(f"### Batch of {len(lines)} requests to {self.name()} for {title}")
+        batch_file = self.client.files.create(file=("batch.jsonl", "\n".join(lines).encode("utf-8")), purpose="batch")
+        batch = self.client.batches.create(input_file_id=batch_file.id,
+                                           endpoint="/v1/chat/completions",
+                                           completion_window="24h")
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            time.sleep(poll_interval)
+            batch = self.client.batches.retrieve(batch.id)
+            logger.info(f"Batch {batch.id} status {batch.status}")
+        if batch.status != "completed" or not batch.output_file_id:
+            raise ValueError(f"LLM batch '{title}' ended with status {batch.status}")
+
+        replies: Dict[str, BaseModel] = {}
+        for line in self.client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            try:
+                llm_text = entry["response"]["body"]["choices"][0]["message"]["content"]
+                llm_text = clean_json_string(llm_text)
+                if fix_function:
+                    llm_text = fix_function(llm_text)
+                self.write_llm_log("llm_out", llm_text)
+                replies[entry["custom_id"]] = targetType(**json5.loads(llm_text))
+            except Exception as e:
+                logger.error(f"Batch reply {entry.get('custom_id')} for '{title}' failed: {e}")
+        return [replies.get(custom_id) for custom_id in custom_ids]
+
     @staticmethod
     def truncate_content(content, max_tokens, tokenizer_name="gpt-4", level="sentence"):
         tokenizer = tiktoken.encoding_for_model(tokenizer_name)
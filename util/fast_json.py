@@ -0,0 +1,41 @@
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """
+    Serializes an object to UTF-8 encoded JSON. Uses orjson if it is installed.
+
+    Parameters:
+        obj (Any): The object to serialize.
+        indent (bool): Indent the output by two spaces.
+
+    Returns:
+        bytes: The JSON document.
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False).encode("utf-8")
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """
+    Deserializes a JSON document. Uses orjson if it is installed.
+
+    Parameters:
+        data (Union[bytes, str]): The JSON document.
+
+    Returns:
+        Any: The deserialized object.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,30 @@
+# tests/test_fast_json.py
+import json
+import unittest
+
+from util import fast_json
+
+
+class TestFastJson(unittest.TestCase):
+
+    def test_roundtrip(self):
+        data = {"title": "Über", "children": [1, 2.5, None, True], "empty": {}}
+        encoded = fast_json.dumps(data)
+        self.assertIsInstance(encoded, bytes)
+        self.assertEqual(fast_json.loads(encoded), data)
+        self.assertEqual(fast_json.loads(encoded.decode("utf-8")), data)
+
+    def test_indent_matches_json(self):
+        data = {"a": [1, {"b": "c"}], "d": "ä"}
+        self.assertEqual(fast_json.dumps(data, indent=True).decode("utf-8"),
+                         json.dumps(data, indent=2, ensure_ascii=False))
+
+    def test_compact_is_valid_json(self):
+        data = {"a": [1, 2], "b": "ß"}
+        encoded = fast_json.dumps(data)
+        self.assertNotIn(b"\n", encoded)
+        self.assertEqual(json.loads(encoded), data)
+
+
+if __name__ == "__main__":
+    unittest.main()
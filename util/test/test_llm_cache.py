@@ -0,0 +1,54 @@
+# tests/test_llm_cache.py
+import os
+import tempfile
+import unittest
+
+from util.LLMCache import LLMCache
+
+
+class TestLLMCache(unittest.TestCase):
+
+    def test_hit_and_miss(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = LLMCache(os.path.join(temp_dir, "cache.jsonl"))
+            key = LLMCache.key("model", "system", "user")
+
+            self.assertIsNone(cache.get(key))
+            cache.put(key, "reply")
+            self.assertEqual(cache.get(key), "reply")
+            self.assertIsNone(cache.get(LLMCache.key("model", "system", "other user")))
+            self.assertEqual(len(cache), 1)
+
+    def test_key_separates_parts(self):
+        self.assertEqual(LLMCache.key("a", "b"), LLMCache.key("a", "b"))
+        self.assertNotEqual(LLMCache.key("ab", "c"), LLMCache.key("a", "bc"))
+        self.assertEqual(LLMCache.key(None, "b"), LLMCache.key("", "b"))
+
+    def test_persistence(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # The directory is created on open
+            filename = os.path.join(temp_dir, "sub", "cache.jsonl")
+            cache = LLMCache(filename)
+            cache.put("k1", "erste Antwort")
+            cache.put("k2", "second")
+            cache.put("k1", "replaced")
+
+            reopened = LLMCache(filename)
+            self.assertEqual(len(reopened), 2)
+            self.assertEqual(reopened.get("k1"), "replaced")
+            self.assertEqual(reopened.get("k2"), "second")
+
+    def test_truncated_last_line_is_skipped(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = os.path.join(temp_dir, "cache.jsonl")
+            LLMCache(filename).put("k1", "reply")
+            with open(filename, "a", encoding="utf-8") as f:
+                f.write('{"key": "k2", "val')
+
+            reopened = LLMCache(filename)
+            self.assertEqual(len(reopened), 1)
+            self.assertEqual(reopened.get("k1"), "reply")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+# tests/test_rate_limiter.py
+import asyncio
+import threading
+import time
+import unittest
+
+from util.LLMSupport import RateLimiter, RATE_LIMITERS, Provider, provider_rate_limiter
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_first_request_does_not_wait(self):
+        limiter = RateLimiter(rate=60, period=60.0)
+        start = time.monotonic()
+        limiter.wait()
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_requests_are_spaced(self):
+        limiter = RateLimiter(rate=20, period=1.0)  # one slot every 50 ms
+        start = time.monotonic()
+        for _ in range(5):
+            limiter.wait()
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+
+    def test_threads_share_the_slots(self):
+        limiter = RateLimiter(rate=20, period=1.0)
+        threads = [threading.Thread(target=limiter.wait) for _ in range(5)]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+
+    def test_acquire_does_not_block_the_loop(self):
+        limiter = RateLimiter(rate=20, period=1.0)
+
+        async def main():
+            start = time.monotonic()
+            await asyncio.gather(*(limiter.acquire() for _ in range(5)))
+            return time.monotonic() - start
+
+        elapsed = asyncio.run(main())
+        # Concurrent waits overlap: the last slot is 200 ms out, not 5 x 200 ms
+        self.assertGreaterEqual(elapsed, 0.19)
+        self.assertLess(elapsed, 0.6)
+
+    def test_provider_limiter_is_shared(self):
+        RATE_LIMITERS.pop(Provider.OLLAMA, None)
+        self.addCleanup(RATE_LIMITERS.pop, Provider.OLLAMA, None)
+        limiter = provider_rate_limiter(Provider.OLLAMA, 60)
+        self.assertIs(provider_rate_limiter(Provider.OLLAMA, 60), limiter)
+        with self.assertLogs("ConnectedAgents", "WARNING"):
+            self.assertIs(provider_rate_limiter(Provider.OLLAMA, 120), limiter)
+        self.assertEqual(limiter.rate, 60)
+
+
+if __name__ == "__main__":
+    unittest.main()